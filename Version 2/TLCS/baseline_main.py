@@ -0,0 +1,76 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import timeit
+from concurrent.futures import ThreadPoolExecutor
+from shutil import copyfile
+
+from testing_simulation import Simulation, import_traci
+from generator import TrafficGenerator
+from visualization import Visualization
+from evaluation import load_test_model
+from utils import import_test_configuration, set_sumo, set_traci, set_test_path
+
+
+if __name__ == "__main__":
+
+    config = import_test_configuration(config_file='testing_settings.ini')
+    sumo_cmd = set_sumo(config['gui'], config['sumocfg_file_name'], config['max_steps'], config['traci_backend'])
+    model_path, plot_path = set_test_path(config['models_path_name'], config['model_to_test'])
+    Traci = set_traci(config['traci_backend'], config['trace_file']) or import_traci()
+
+    Model = load_test_model(config, model_path)
+
+    Visualization = Visualization(
+        plot_path,
+        dpi=96,
+        background=config['background_plots']
+    )
+
+    # one SUMO instance per policy, on its own labeled traci connection and route file generated with the same seed
+    simulations = {}
+    route_files = {}
+    for label in ('model', 'baseline'):
+        route_files[label] = os.path.join(plot_path, 'routes_' + label + '.rou.xml')
+        simulations[label] = Simulation(
+            Model,
+            TrafficGenerator(config['max_steps'], config['n_cars_generated'], route_files[label]),
+            sumo_cmd + ["--route-files", route_files[label]],
+            config['max_steps'],
+            config['green_duration'],
+            config['yellow_duration'],
+            config['num_states'],
+            config['num_actions'],
+            Traci=Traci,
+            label=label,
+            starvation_threshold=config['starvation_threshold']
+        )
+
+    print('\n----- Test episode of the model and of the fixed time baseline, side by side')
+    start_time = timeit.default_timer()
+    with ThreadPoolExecutor(max_workers=2) as executor:  # the threads mostly wait for their own SUMO process
+        model_run = executor.submit(simulations['model'].run, config['episode_seed'])
+        baseline_run = executor.submit(simulations['baseline'].run_c, config['episode_seed'])
+        model_run.result()
+        baseline_run.result()
+    print('Simulation time:', round(timeit.default_timer() - start_time, 1), 's')
+    for route_file in route_files.values():
+        os.remove(route_file)
+
+    waiting_times = {'model': simulations['model'].sum_waiting_times, 'baseline': simulations['baseline'].sum_waiting_times_c}
+    lines = ['model %d against the fixed time cycle, seed %d' % (config['model_to_test'], config['episode_seed'])]
+    for label, data in waiting_times.items():
+        lines.append('%-9s total waiting time: %12.1f s - average per vehicle: %8.2f s - mean accumulated waiting time: %12.1f s' % (
+            label, data[-1], data[-1] / config['n_cars_generated'], sum(data) / len(data)))
+    gain = 1 - waiting_times['model'][-1] / waiting_times['baseline'][-1] if waiting_times['baseline'][-1] else float('nan')
+    lines.append('waiting time reduction of the model: %.1f%%' % (100 * gain))
+    report = '\n'.join(lines)
+    print(report)
+
+    with open(os.path.join(plot_path, 'baseline_comparison.txt'), 'w') as file:
+        file.write(report)
+    copyfile(src='testing_settings.ini', dst=os.path.join(plot_path, 'testing_settings.ini'))
+    print("----- Testing info saved at:", plot_path)
+
+    Visualization.save_data_and_plot_2(data1=waiting_times['model'], data2=waiting_times['baseline'], filename='wait_time_baseline', xlabel='Step', ylabel='Accumulated Wait Time (Vehicles)')
@@ -0,0 +1,311 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import json
+import shutil
+import argparse
+import datetime
+import platform
+import subprocess
+import sys
+import tempfile
+import timeit
+import numpy as np
+
+from memory import Memory
+from generator import TrafficGenerator
+from numpy_model import NumpyTestModel
+from fake_traci import FakeTraci
+from starvation import StarvationGuard
+import training_simulation
+import testing_simulation
+
+
+# modules whose import time is measured: the helpers and the entry points, whose imports stop at their main block
+IMPORTED_MODULES = ['utils', 'generator', 'numpy_model', 'testing_simulation', 'training_simulation', 'visualization', 'evaluation',
+                    'testing_main', 'training_main', 'evaluation_main', 'sweep_main', 'plot_main', 'model']
+
+# lane and edge ids read by the observation functions
+INCOMING_EDGES = ["E2TL", "N2TL", "W2TL", "S2TL"]
+ALL_EDGES = INCOMING_EDGES + ["TL2E", "TL2N", "TL2W", "TL2S"]
+
+
+class SyntheticTraci:  # static random observations, enough to time the observation functions without SUMO
+    def __init__(self, n_cars, seed=0):
+        rng = np.random.RandomState(seed)
+        self._car_ids = ['car_%i' % i for i in range(n_cars)]
+        self._roads = dict(zip(self._car_ids, rng.choice(ALL_EDGES, n_cars)))
+        self._waits = dict(zip(self._car_ids, rng.uniform(0, 100, n_cars)))
+        self._lane_counts = {edge + '_' + str(lane): int(rng.randint(0, 30)) for edge in INCOMING_EDGES for lane in range(4)}
+        self._halting = {edge: int(rng.randint(0, 60)) for edge in INCOMING_EDGES}
+        self.vehicle = _Domain(getIDList=lambda: self._car_ids, getAccumulatedWaitingTime=self._waits.get, getRoadID=self._roads.get)
+        self.lane = _Domain(getLastStepVehicleNumber=self._lane_counts.get)
+        self.edge = _Domain(getLastStepHaltingNumber=self._halting.get)
+        self.trafficlight = _Domain(setPhase=lambda tl_id, phase: None)
+
+
+class _Domain:
+    def __init__(self, **methods):
+        self.__dict__.update(methods)
+
+
+class _NumpyTrainModel:  # TrainModel stand-in without tensorflow
+    def __init__(self, model_path, batch_size):
+        self._Model = NumpyTestModel(8, model_path)
+        self.batch_size = batch_size
+        self.has_target_network = False
+
+
+    def predict_batch(self, states):
+        return self._Model.predict_batch(states)
+
+
+    def train_batch(self, states, q_sa):
+        pass
+
+
+def measure(function, repeats=5, min_time=0.2):
+    """
+    Time function, calling it enough times to last at least min_time, and return the best mean time per call in microseconds
+    """
+    number = 1
+    while True:
+        elapsed = timeit.timeit(function, number=number)
+        if elapsed >= min_time or number >= 1e6:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+    timings = [elapsed] + [timeit.timeit(function, number=number) for _ in range(repeats - 1)]
+    return {'number': number, 'best_us': round(1e6 * min(timings) / number, 3), 'mean_us': round(1e6 * np.mean(timings) / number, 3)}
+
+
+def write_random_model(path, width, num_layers, seed=0):
+    """
+    Write a npz model with random weights shaped like a trained model of the given width and number of layers
+    """
+    rng = np.random.RandomState(seed)
+    dims = [8] + [width] * (num_layers + 1) + [8]
+    arrays = {}
+    for i in range(len(dims) - 1):
+        arrays['kernel_%d' % i] = (rng.standard_normal((dims[i], dims[i + 1])) / np.sqrt(dims[i])).astype(np.float32)
+        arrays['bias_%d' % i] = np.zeros(dims[i + 1], dtype=np.float32)
+    activations = ['relu'] * (len(dims) - 2) + ['linear']
+    np.savez(os.path.join(path, 'trained_model.npz'), num_layers=len(dims) - 1, activations=np.array(activations), **arrays)
+
+
+def fill_memory(capacity, seed=0):
+    """
+    Return a full memory of the given capacity holding random samples
+    """
+    rng = np.random.RandomState(seed)
+    Mem = Memory(capacity, 1)
+    for _ in range(capacity):
+        Mem.add_sample((rng.randint(0, 30, 8).astype(float), int(rng.randint(0, 8)), -float(rng.randint(0, 100)), rng.randint(0, 30, 8).astype(float)))
+    return Mem
+
+
+def bench_memory(quick):
+    results = []
+    for capacity in ([1000, 10000] if quick else [1000, 10000, 50000]):
+        Mem = fill_memory(capacity)
+        sample = (np.zeros(8), 0, 0.0, np.zeros(8))
+        results.append(dict(name='memory_add_sample', capacity=capacity, **measure(lambda: Mem.add_sample(sample))))
+        for batch_size in [32, 100, 512]:
+            results.append(dict(name='memory_get_samples', capacity=capacity, batch_size=batch_size, **measure(lambda: Mem.get_samples(batch_size))))
+    return results
+
+
+def bench_numpy_model(work_path, quick):
+    results = []
+    for width in ([100, 400] if quick else [50, 100, 200, 400]):
+        write_random_model(work_path, width, num_layers=4)
+        Model = NumpyTestModel(8, work_path)
+        state = np.random.RandomState(0).randint(0, 30, 8).astype(float)
+        results.append(dict(name='numpy_predict_one', width=width, **measure(lambda: Model.predict_one(state))))
+        for batch_size in [100, 1000]:
+            states = np.random.RandomState(0).randint(0, 30, (batch_size, 8)).astype(np.float32)
+            results.append(dict(name='numpy_predict_batch', width=width, batch_size=batch_size, **measure(lambda: Model.predict_batch(states))))
+    return results
+
+
+def bench_train_model(quick):
+    try:
+        from model import TrainModel
+    except ImportError:
+        print('tensorflow not available, skipping TrainModel benchmarks')
+        return []
+
+    results = []
+    for width in ([400] if quick else [100, 400]):
+        Model = TrainModel(4, width, 100, 0.001, input_dim=8, output_dim=8)
+        state = np.random.RandomState(0).randint(0, 30, 8).astype(float)
+        results.append(dict(name='predict_one', width=width, **measure(lambda: Model.predict_one(state), repeats=3)))
+        for batch_size in [32, 100, 512]:
+            states = np.random.RandomState(0).randint(0, 30, (batch_size, 8)).astype(float)
+            q_sa = np.random.RandomState(1).standard_normal((batch_size, 8))
+            results.append(dict(name='predict_batch', width=width, batch_size=batch_size, **measure(lambda: Model.predict_batch(states), repeats=3)))
+            results.append(dict(name='train_batch', width=width, batch_size=batch_size, **measure(lambda: Model.train_batch(states, q_sa), repeats=3)))
+
+        Sim = training_simulation.Simulation(Model, fill_memory(10000), None, None, 0.75, 5400, 10, 4, 8, 8, 1, Traci=SyntheticTraci(0))
+        results.append(dict(name='replay', width=width, batch_size=100, **measure(Sim._replay, repeats=3)))
+    return results
+
+
+def bench_replay_overhead(work_path, quick):
+    results = []
+    write_random_model(work_path, 400, num_layers=4)
+    for capacity in ([10000] if quick else [1000, 10000, 50000]):
+        for batch_size in [32, 100, 512]:
+            Model = _NumpyTrainModel(work_path, batch_size)  # numpy inference and no fit: the python side of _replay
+            Sim = training_simulation.Simulation(Model, fill_memory(capacity), None, None, 0.75, 5400, 10, 4, 8, 8, 1, Traci=SyntheticTraci(0))
+            results.append(dict(name='replay_numpy_no_fit', capacity=capacity, batch_size=batch_size, **measure(Sim._replay)))
+    return results
+
+
+def bench_generator(work_path, quick):
+    results = []
+    cwd = os.getcwd()
+    os.makedirs(os.path.join(work_path, 'intersection'), exist_ok=True)
+    os.chdir(work_path)  # the generator writes in intersection/ of the working directory
+    try:
+        for n_cars in ([1000] if quick else [500, 1000, 5000]):
+            TrafficGen = TrafficGenerator(5400, n_cars)
+            results.append(dict(name='generate_routefile', n_cars=n_cars, **measure(lambda: TrafficGen.generate_routefile(seed=0), repeats=3)))
+    finally:
+        os.chdir(cwd)
+    return results
+
+
+def bench_observations(quick):
+    results = []
+    for n_cars in ([100, 1000] if quick else [10, 100, 1000, 5000]):
+        Traci = SyntheticTraci(n_cars)
+        Sim = training_simulation.Simulation(None, None, None, None, 0.75, 5400, 10, 4, 8, 8, 1, Traci=Traci)
+        Sim._waiting_times = {}
+        TestSim = testing_simulation.Simulation(None, None, None, 5400, 10, 4, 8, 8, Traci=Traci)
+        TestSim._waiting_times = {}
+        results.append(dict(name='get_state', n_cars=n_cars, **measure(Sim._get_state)))
+        results.append(dict(name='get_queue_length', n_cars=n_cars, **measure(Sim._get_queue_length)))
+        results.append(dict(name='collect_waiting_times', n_cars=n_cars, **measure(Sim._collect_waiting_times)))
+        results.append(dict(name='testing_collect_waiting_times', n_cars=n_cars, **measure(TestSim._collect_waiting_times)))
+    return results
+
+
+def bench_decision(work_path, quick):
+    results = []
+    write_random_model(work_path, 400, num_layers=4)
+    Model = NumpyTestModel(8, work_path)
+    state = np.random.RandomState(0).randint(0, 30, 8).astype(float)
+    for threshold in [0, 10]:
+        Guard = StarvationGuard(threshold)
+        results.append(dict(name='starvation_guard_choose', threshold=threshold, **measure(lambda: Guard.choose(3))))
+        Sim = testing_simulation.Simulation(Model, None, None, 5400, 10, 4, 8, 8, Traci=SyntheticTraci(0), starvation_threshold=threshold)
+        results.append(dict(name='testing_choose_action', threshold=threshold, **measure(lambda: Sim._choose_action(state))))
+    return results
+
+
+def bench_simulation(work_path, quick):
+    results = []
+    os.makedirs(os.path.join(work_path, 'intersection'), exist_ok=True)
+    for file_name in ['environment.net.xml', 'sumo_config.sumocfg.xml']:
+        shutil.copy(os.path.join('intersection', file_name), os.path.join(work_path, 'intersection', file_name))
+    sumo_cmd = ['sumo', '-c', os.path.join('intersection', 'sumo_config.sumocfg.xml')]
+    write_random_model(work_path, 400, num_layers=4)
+    Model = NumpyTestModel(8, work_path)
+    cwd = os.getcwd()
+    os.chdir(work_path)  # the generator writes in intersection/ of the working directory
+    try:
+        for n_cars in ([1000] if quick else [500, 1000, 3000]):
+            Sim = testing_simulation.Simulation(Model, TrafficGenerator(5400, n_cars), sumo_cmd, 5400, 10, 4, 8, 8, Traci=FakeTraci())
+            results.append(dict(name='testing_run_fake_traci', n_cars=n_cars, **measure(lambda: Sim.run(episode=0), repeats=3, min_time=0)))
+    finally:
+        os.chdir(cwd)
+    return results
+
+
+def bench_imports(quick):
+    """
+    Time the import of every module in a new interpreter, so that nothing is already imported
+    """
+    results = []
+    code = 'import time; start = time.perf_counter(); import %s; print(time.perf_counter() - start)'
+    for module in (IMPORTED_MODULES[:8] if quick else IMPORTED_MODULES):
+        times = []
+        for _ in range(3):
+            process = subprocess.run([sys.executable, '-c', code % module], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            if process.returncode != 0:
+                break
+            times.append(float(process.stdout.decode().split()[-1]))
+        if not times:
+            print('import of', module, 'failed, skipping it')  # e.g. tensorflow or sumolib not installed
+            continue
+        results.append(dict(name='import', module=module, number=len(times), best_us=round(min(times) * 1e6, 3), mean_us=round(sum(times) / len(times) * 1e6, 3)))
+    return results
+
+
+def compare(results, reference_file):
+    """
+    Print the ratio between the new timings and those of a previous results file
+    """
+    with open(reference_file) as file:
+        reference = {_key(result): result for result in json.load(file)['results']}
+    print('\n%-70s %12s %12s %8s' % ('benchmark', 'before (us)', 'after (us)', 'ratio'))
+    for result in results:
+        before = reference.get(_key(result))
+        if before is not None:
+            print('%-70s %12.3f %12.3f %7.2fx' % (_key(result), before['best_us'], result['best_us'], result['best_us'] / before['best_us']))
+
+
+def _key(result):
+    parameters = ' '.join('%s=%s' % (name, value) for name, value in sorted(result.items()) if name not in ('name', 'number', 'best_us', 'mean_us'))
+    return result['name'] + ' ' + parameters
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Benchmark the hot paths of the TLCS, without SUMO')
+    parser.add_argument('--output', default='benchmark_results.json', help='json file where the results are written')
+    parser.add_argument('--compare', metavar='RESULTS_FILE', help='results of a previous run to compare with')
+    parser.add_argument('--quick', action='store_true', help='fewer sizes, for a fast check')
+    args = parser.parse_args()
+
+    work_path = tempfile.mkdtemp()
+    results = []
+    try:
+        for name, bench in [('memory', lambda: bench_memory(args.quick)),
+                            ('numpy model', lambda: bench_numpy_model(work_path, args.quick)),
+                            ('train model', lambda: bench_train_model(args.quick)),
+                            ('replay overhead', lambda: bench_replay_overhead(work_path, args.quick)),
+                            ('route generation', lambda: bench_generator(work_path, args.quick)),
+                            ('observations', lambda: bench_observations(args.quick)),
+                            ('decision', lambda: bench_decision(work_path, args.quick)),
+                            ('full episode', lambda: bench_simulation(work_path, args.quick)),
+                            ('imports', lambda: bench_imports(args.quick))]:
+            print('----- Benchmarking', name)
+            results += bench()
+    finally:
+        shutil.rmtree(work_path, ignore_errors=True)
+
+    for result in results:
+        print('%-70s %12.3f us' % (_key(result), result['best_us']))
+
+    with open(args.output, 'w') as file:
+        json.dump({
+            'commit': _git_commit(),
+            'date': datetime.datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'results': results
+        }, file, indent=4)
+    print("----- Benchmark results saved at:", args.output)
+
+    if args.compare:
+        compare(results, args.compare)
@@ -0,0 +1,182 @@
+import configparser
+import contextlib
+import datetime
+import glob
+import json
+import os
+import re
+import sqlite3
+import numpy as np
+
+from metrics import MetricsFile, METRICS_FILE_NAME
+
+
+CATALOG_FILE_NAME = 'runs.sqlite'  # in the models folder, next to the model folders it describes
+
+COLUMNS = ['name', 'model_number', 'kind', 'status', 'config', 'start_time', 'end_time', 'episodes', 'steps_per_second', 'metrics', 'evaluation']
+JSON_COLUMNS = ['config', 'metrics', 'evaluation']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    name TEXT PRIMARY KEY,
+    model_number INTEGER,
+    kind TEXT,
+    status TEXT,
+    config TEXT,
+    start_time TEXT,
+    end_time TEXT,
+    episodes INTEGER,
+    steps_per_second REAL,
+    metrics TEXT,
+    evaluation TEXT
+)
+"""
+
+
+class RunCatalog:
+    def __init__(self, file_path):
+        self._file_path = file_path
+        with self._connect() as connection:
+            connection.execute('PRAGMA journal_mode=WAL')  # readers do not block the sessions writing
+            connection.execute(SCHEMA)
+
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """
+        Connection committed at the end of the block, or rolled back if it raised, then closed
+        """
+        connection = sqlite3.connect(self._file_path, timeout=30)  # waits for the other sessions writing at the same time
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+
+    def start_run(self, run_path, kind, config):
+        """
+        Record that a session started writing in run_path, or resumed from a checkpoint
+        """
+        name = run_name(run_path)
+        with self._connect() as connection:
+            connection.execute(
+                'INSERT INTO runs (name, model_number, kind, status, config, start_time) VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(name) DO UPDATE SET status = excluded.status, end_time = NULL',
+                (name, model_number(name), kind, 'running', json.dumps(config, default=str), now()))
+
+
+    def update_run(self, run_path, **fields):
+        """
+        Set columns of the run, the json ones (config, metrics, evaluation) given as dicts
+        """
+        unknown = set(fields) - set(COLUMNS)
+        if unknown:
+            raise ValueError('Unknown columns of the run catalog: ' + ', '.join(sorted(unknown)))
+        values = [json.dumps(value, default=str) if column in JSON_COLUMNS else value for column, value in fields.items()]
+        with self._connect() as connection:
+            connection.execute('INSERT OR IGNORE INTO runs (name, model_number) VALUES (?, ?)', (run_name(run_path), model_number(run_name(run_path))))
+            connection.execute('UPDATE runs SET ' + ', '.join(column + ' = ?' for column in fields) + ' WHERE name = ?',
+                               values + [run_name(run_path)])
+
+
+    def end_run(self, run_path, **fields):
+        """
+        Record that the session of run_path finished, with its final columns (episodes, steps_per_second, metrics...)
+        """
+        self.update_run(run_path, status='finished', end_time=now(), **fields)
+
+
+    def runs(self, where='', parameters=()):
+        """
+        Return the runs as dicts, ordered by model number, optionally filtered by an SQL condition
+        """
+        with self._connect() as connection:
+            rows = connection.execute('SELECT ' + ', '.join(COLUMNS) + ' FROM runs' + (' WHERE ' + where if where else '') +
+                                      ' ORDER BY model_number', parameters).fetchall()
+        runs = []
+        for row in rows:
+            run = dict(zip(COLUMNS, row))
+            for column in JSON_COLUMNS:
+                run[column] = json.loads(run[column]) if run[column] else None
+            runs.append(run)
+        return runs
+
+
+    @property
+    def file_path(self):
+        return self._file_path
+
+
+def open_catalog(run_path):
+    """
+    Return the catalog of the models folder containing run_path
+    """
+    return RunCatalog(os.path.join(os.path.dirname(os.path.normpath(run_path)), CATALOG_FILE_NAME))
+
+
+def run_name(run_path):
+    return os.path.basename(os.path.normpath(run_path))
+
+
+def model_number(name):
+    """
+    Number of a model_N folder, None for any other name
+    """
+    match = re.fullmatch(r'model_(\d+)', name)
+    return int(match.group(1)) if match else None
+
+
+def now():
+    return datetime.datetime.now().isoformat(timespec='seconds')
+
+
+def index_existing_runs(Catalog, models_path):
+    """
+    Add to the catalog the model folders it does not know yet, from their saved settings and metrics,
+    and return their names. The start and end times are only estimated from the dates of the files
+    """
+    known = set(run['name'] for run in Catalog.runs() if run['kind'] is not None)  # not only evaluated
+    added = []
+    for folder_path in sorted(glob.glob(os.path.join(models_path, 'model_*', ''))):
+        name = run_name(folder_path)
+        if name in known or model_number(name) is None:
+            continue
+        file_times = [os.path.getmtime(file_path) for file_path in glob.glob(os.path.join(folder_path, '*'))]
+        if not file_times:
+            continue
+
+        content = configparser.ConfigParser()
+        content.read(os.path.join(folder_path, 'training_settings.ini'))
+        config = {section + '.' + key: value for section in content.sections() for key, value in content[section].items()}
+
+        metrics = {}
+        series = read_saved_series(folder_path)
+        for metric, data in series.items():
+            if len(data):
+                metrics[metric] = float(data[-1])
+        if 'reward' in series and len(series['reward']):
+            metrics['best_reward'] = float(np.max(series['reward']))
+
+        Catalog.update_run(folder_path, kind='training', status='indexed', config=config,
+                           start_time=datetime.datetime.fromtimestamp(min(file_times)).isoformat(timespec='seconds'),
+                           end_time=datetime.datetime.fromtimestamp(max(file_times)).isoformat(timespec='seconds'),
+                           episodes=len(series.get('reward', [])) or None, metrics=metrics)
+        added.append(name)
+    return added
+
+
+def read_saved_series(folder_path):
+    """
+    Return the reward, delay and queue series saved by a training session, from its metrics file or its older text files
+    """
+    Metrics = MetricsFile(os.path.join(folder_path, METRICS_FILE_NAME))
+    columns = Metrics.columns
+    series = {}
+    for metric in ['reward', 'delay', 'queue']:
+        text_file_path = os.path.join(folder_path, 'plot_' + metric + '_data.txt')
+        if metric in columns:
+            series[metric] = Metrics.load(metric, mmap=False)
+        elif os.path.isfile(text_file_path) and os.path.getsize(text_file_path) > 0:
+            series[metric] = np.loadtxt(text_file_path, dtype=np.float64, ndmin=1)
+    return series
@@ -0,0 +1,63 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import json
+import argparse
+
+from catalog import RunCatalog, index_existing_runs, CATALOG_FILE_NAME
+from utils import import_test_configuration
+
+
+def run_value(run, column):
+    """
+    Value of a column of a run, or of one of its final metrics (e.g. reward) or evaluation metrics (e.g. evaluation.average_waiting_time)
+    """
+    if column in run:
+        return run[column]
+    if column.startswith('evaluation.'):
+        return ((run['evaluation'] or {}).get(column[len('evaluation.'):]) or {}).get('mean')
+    return (run['metrics'] or {}).get(column)
+
+
+def format_cell(value, width):
+    if value is None:
+        return '%*s' % (width, '-')
+    if isinstance(value, float):
+        return '%*.2f' % (width, value)
+    return '%*s' % (width, value)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='List the sessions of the models folder recorded in its run catalog')
+    parser.add_argument('--index', action='store_true', help='first add the model folders the catalog does not know yet')
+    parser.add_argument('--where', default='', help="SQL condition on the columns, e.g. \"status = 'finished' AND episodes >= 100\"")
+    parser.add_argument('--sort', help='column or metric to sort by, e.g. best_reward or evaluation.average_waiting_time')
+    parser.add_argument('--reverse', action='store_true', help='sort in decreasing order, e.g. the best reward first')
+    parser.add_argument('--json', action='store_true', help='print the runs as json, with their configuration')
+    args = parser.parse_args()
+
+    config = import_test_configuration(config_file='testing_settings.ini')
+    models_path = os.path.join(os.getcwd(), config['models_path_name'])
+    Catalog = RunCatalog(os.path.join(models_path, CATALOG_FILE_NAME))
+
+    if args.index:
+        added = index_existing_runs(Catalog, models_path)
+        print('Indexed', len(added), 'model folders' + (': ' + ', '.join(added) if added else ''))
+
+    runs = Catalog.runs(args.where)
+    if args.sort:
+        runs.sort(key=lambda run: run_value(run, args.sort) is None)  # runs without the value last, in both orders
+        known = [run for run in runs if run_value(run, args.sort) is not None]
+        runs = sorted(known, key=lambda run: run_value(run, args.sort), reverse=args.reverse) + runs[len(known):]
+
+    if args.json:
+        print(json.dumps(runs, indent=4))
+    else:
+        columns = [('name', 10), ('kind', 17), ('status', 9), ('start_time', 20), ('end_time', 20), ('episodes', 9),
+                   ('steps_per_second', 17), ('reward', 11), ('best_reward', 12), ('evaluation.average_waiting_time', 32)]
+        print(' '.join(format_cell(column, width) for column, width in columns))
+        for run in runs:
+            print(' '.join(format_cell(run_value(run, column), width) for column, width in columns))
+        print(len(runs), 'runs in', Catalog.file_path)
@@ -0,0 +1,70 @@
+import os
+import pickle
+import random
+import shutil
+import numpy as np
+
+
+def save_checkpoint(path, episode, epsilon, Model, Memory, Simulation):
+    """
+    Save everything needed to resume the training after the given episode in a new folder of the model path,
+    then point the 'checkpoint' file to it and remove the previous checkpoint
+    """
+    checkpoint_name = 'checkpoint_' + str(episode)
+    checkpoint_path = os.path.join(path, checkpoint_name)
+    tmp_path = checkpoint_path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    Model.save_checkpoint(os.path.join(tmp_path, 'model.npz'))
+    np.savez(os.path.join(tmp_path, 'memory.npz'), **Memory.to_arrays())
+    state = {
+        'episode': episode,
+        'epsilon': epsilon,
+        'simulation': Simulation.get_checkpoint_state(),
+        'python_random_state': random.getstate(),
+        'numpy_random_state': np.random.get_state()
+    }
+    with open(os.path.join(tmp_path, 'state.pkl'), 'wb') as file:
+        pickle.dump(state, file)
+
+    # a crash at any point leaves the previous checkpoint usable
+    shutil.rmtree(checkpoint_path, ignore_errors=True)
+    os.rename(tmp_path, checkpoint_path)
+    previous_name = _latest_checkpoint_name(path)
+    with open(os.path.join(path, 'checkpoint.tmp'), 'w') as file:
+        file.write(checkpoint_name)
+    os.replace(os.path.join(path, 'checkpoint.tmp'), os.path.join(path, 'checkpoint'))
+    if previous_name is not None and previous_name != checkpoint_name:
+        shutil.rmtree(os.path.join(path, previous_name), ignore_errors=True)
+
+
+def load_checkpoint(path, Model, Memory, Simulation):
+    """
+    Restore the last checkpoint saved in the model path and return the number of the next episode to run
+    """
+    checkpoint_name = _latest_checkpoint_name(path)
+    if checkpoint_name is None:
+        return 0
+    checkpoint_path = os.path.join(path, checkpoint_name)
+
+    Model.load_checkpoint(os.path.join(checkpoint_path, 'model.npz'))
+    with np.load(os.path.join(checkpoint_path, 'memory.npz')) as memory:
+        Memory.load_arrays(memory)
+    with open(os.path.join(checkpoint_path, 'state.pkl'), 'rb') as file:
+        state = pickle.load(file)
+    Simulation.load_checkpoint_state(state['simulation'])
+    random.setstate(state['python_random_state'])
+    np.random.set_state(state['numpy_random_state'])
+    return state['episode'] + 1
+
+
+def _latest_checkpoint_name(path):
+    """
+    Name of the folder of the last complete checkpoint, if any
+    """
+    pointer_path = os.path.join(path, 'checkpoint')
+    if os.path.isfile(pointer_path):
+        with open(pointer_path) as file:
+            return file.read().strip()
+    return None
@@ -0,0 +1,46 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import glob
+import argparse
+
+from metrics import convert_text_metrics, METRICS_FILE_NAME
+from plotting import add_plot, read_plots
+
+
+# labels of the plots written by training_main.py and testing_main.py, the other columns are plotted against their index
+TRAINING_LABELS = {
+    'reward': ('Episode', 'Cumulative negative reward'),
+    'delay': ('Episode', 'Cumulative delay (s)'),
+    'queue': ('Episode', 'Average queue length (vehicles)')
+}
+TESTING_LABELS = {
+    'reward': ('Action step', 'Reward'),
+    'queue': ('Step', 'Queue length (vehicles)')
+}
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Convert the plot_*_data.txt and single column csv files of folders to their metrics file')
+    parser.add_argument('folders', nargs='*', help='folders to convert, by default the models, their tests and Wait_times')
+    parser.add_argument('--remove', action='store_true', help='remove the text files once converted')
+    args = parser.parse_args()
+
+    folders = args.folders or sorted(glob.glob(os.path.join('models', '*', '')) + glob.glob(os.path.join('models', '*', 'test', '')) +
+                                     glob.glob(os.path.join('prevmodels', '*', '')) + glob.glob(os.path.join('prevmodels', '*', 'test', ''))) + ['Wait_times']
+
+    for folder in folders:
+        if not os.path.isdir(folder):
+            print('Skipped', folder, '(not a folder)')
+            continue
+        names = convert_text_metrics(folder, args.remove)
+        labels = TESTING_LABELS if os.path.basename(os.path.normpath(folder)) == 'test' else TRAINING_LABELS
+        plots = read_plots(folder)
+        for name in names:
+            if name not in plots:  # so that plot_main.py can render the converted columns
+                xlabel, ylabel = labels.get(name, ('Step', name))
+                add_plot(folder, name, [name], xlabel, ylabel, dpi=96)
+        if names:
+            print(os.path.join(folder, METRICS_FILE_NAME) + ':', ', '.join(names))
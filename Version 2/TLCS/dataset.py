@@ -0,0 +1,204 @@
+import json
+import os
+import queue
+import threading
+import numpy as np
+
+
+# columns of a dataset, one npy file per column and per shard
+COLUMNS = {
+    'states': np.float32,
+    'actions': np.uint8,
+    'rewards': np.float32,
+    'next_states': np.float32,
+    'episodes': np.int32,
+    'seeds': np.int32
+}
+
+MANIFEST_FILE_NAME = 'dataset.json'
+
+
+class DatasetWriter:
+    def __init__(self, path):
+        self._path = path
+        os.makedirs(path, exist_ok=True)
+        self._manifest = _read_manifest(path)
+        self._samples = []
+
+
+    def add_sample(self, sample):
+        """
+        Buffer a (state, action, reward, next_state) transition, written at the end of the episode
+        """
+        self._samples.append(sample)
+
+
+    def add_decisions(self, decisions):
+        """
+        Buffer the transitions between the consecutive decisions recorded by a DecisionRecorder,
+        the reward being minus the queue length seen at the next decision as in training
+        """
+        states = decisions['states']
+        for i in range(len(states) - 1):
+            self._samples.append((states[i], int(decisions['actions'][i]), -float(decisions['queue_lengths'][i + 1]), states[i + 1]))
+
+
+    def end_episode(self, name, episode, seed, source):
+        """
+        Write the buffered transitions as the shard name, replacing a previous shard of the same name
+        """
+        columns = {
+            'states': [sample[0] for sample in self._samples],
+            'actions': [sample[1] for sample in self._samples],
+            'rewards': [sample[2] for sample in self._samples],
+            'next_states': [sample[3] for sample in self._samples],
+            'episodes': [episode] * len(self._samples),
+            'seeds': [seed] * len(self._samples)
+        }
+        for column, values in columns.items():
+            np.save(os.path.join(self._path, '%s.%s.npy' % (name, column)), np.array(values, dtype=COLUMNS[column]))
+
+        self._manifest['shards'][name] = {'rows': len(self._samples), 'episode': episode, 'seed': seed, 'source': source}
+        tmp_file_path = os.path.join(self._path, MANIFEST_FILE_NAME + '.tmp')
+        with open(tmp_file_path, 'w') as file:
+            json.dump(self._manifest, file, indent=4)
+        os.replace(tmp_file_path, os.path.join(self._path, MANIFEST_FILE_NAME))  # the shard is visible only once complete
+        self._samples = []
+
+
+class RecordingMemory:  # Memory that also hands every sample to a DatasetWriter
+    def __init__(self, Memory, Writer):
+        self._Memory = Memory
+        self._Writer = Writer
+
+
+    def add_sample(self, sample):
+        self._Memory.add_sample(sample)
+        self._Writer.add_sample(sample)
+
+
+    def __getattr__(self, name):
+        return getattr(self._Memory, name)
+
+
+class Dataset:
+    def __init__(self, paths):
+        """
+        Open one or more dataset folders, the shards of all of them being read as a single dataset
+        """
+        self._shards = []
+        for path in paths:
+            manifest = _read_manifest(path)
+            self._shards += [(os.path.join(path, name), info) for name, info in sorted(manifest['shards'].items()) if info['rows'] > 0]
+        if not self._shards:
+            raise ValueError('no transitions found in ' + ', '.join(paths))
+        self._offsets = np.cumsum([0] + [info['rows'] for _, info in self._shards])  # first row of every shard, then the total
+        self._columns = {}
+
+
+    def column(self, name):
+        """
+        Return the memory mapped arrays of a column, one per shard, opened on first use
+        """
+        if name not in self._columns:
+            self._columns[name] = [np.load('%s.%s.npy' % (shard, name), mmap_mode='r') for shard, _ in self._shards]
+        return self._columns[name]
+
+
+    def take(self, name, indexes):
+        """
+        Return the rows of a column at the given dataset indexes, reading only those rows from the shards
+        """
+        shards = self.column(name)
+        order = np.argsort(indexes, kind='stable')
+        sorted_indexes = indexes[order]
+        bounds = np.searchsorted(sorted_indexes, self._offsets)  # the rows of shard i are sorted_indexes[bounds[i]:bounds[i + 1]]
+        rows = np.empty((len(indexes),) + shards[0].shape[1:], dtype=shards[0].dtype)
+        for i in np.flatnonzero(bounds[1:] > bounds[:-1]):
+            rows[order[bounds[i]:bounds[i + 1]]] = shards[i][sorted_indexes[bounds[i]:bounds[i + 1]] - self._offsets[i]]
+        return rows
+
+
+    def batches(self, batch_size, seed):
+        """
+        Yield (states, actions, rewards, next_states) batches covering the dataset once in a random order
+        """
+        order = np.random.RandomState(seed).permutation(self.num_transitions)
+        for start in range(0, len(order), batch_size):
+            indexes = order[start:start + batch_size]
+            yield tuple(self.take(name, indexes) for name in ('states', 'actions', 'rewards', 'next_states'))
+
+
+    @property
+    def num_transitions(self):
+        return int(self._offsets[-1])
+
+
+    @property
+    def num_shards(self):
+        return len(self._shards)
+
+
+class Prefetcher:  # iterates over an iterable filled ahead by a background thread
+    def __init__(self, iterable, depth=4):
+        self._queue = queue.Queue(maxsize=depth)
+        self._thread = threading.Thread(target=self._fill, args=(iterable,), daemon=True)
+        self._thread.start()
+
+
+    def _fill(self, iterable):
+        try:
+            for item in iterable:
+                self._queue.put((item, None))
+        except Exception as error:  # re-raised in the consumer
+            self._queue.put((None, error))
+        self._queue.put((_END, None))
+
+
+    def __iter__(self):
+        while True:
+            item, error = self._queue.get()
+            if error is not None:
+                raise error
+            if item is _END:
+                return
+            yield item
+
+
+def train_offline(Model, Data, gamma, epochs, prefetch_depth=4):
+    """
+    Train Model with the same Q-learning update as the replay of training_simulation, on the batches of a dataset
+    prepared by a background thread. The target network, if any, is synchronized at the beginning of every epoch.
+    Return the mean absolute temporal difference error of every epoch
+    """
+    td_errors = []
+    for epoch in range(epochs):
+        Model.sync_target()
+        Model.set_random_seed(epoch)
+        total_error = 0.0
+        for states, actions, rewards, next_states in Prefetcher(Data.batches(Model.batch_size, seed=epoch), prefetch_depth):
+            q_s_a = Model.predict_batch(states)
+            max_q_next = np.amax(Model.predict_target_batch(next_states), axis=1)
+            rows = np.arange(len(actions))
+            targets = rewards + gamma * max_q_next
+            total_error += np.sum(np.abs(targets - q_s_a[rows, actions]))
+            q_s_a[rows, actions] = targets
+            Model.train_batch(states, q_s_a)
+        td_errors.append(float(total_error / Data.num_transitions))
+        print('Epoch', epoch + 1, 'of', epochs, '- mean TD error:', round(td_errors[-1], 3))
+    return td_errors
+
+
+_END = object()
+
+
+def _read_manifest(path):
+    """
+    Return the manifest of the dataset folder, empty if it does not exist yet
+    """
+    manifest_file_path = os.path.join(path, MANIFEST_FILE_NAME)
+    if not os.path.isfile(manifest_file_path):
+        return {'columns': list(COLUMNS), 'shards': {}}
+    with open(manifest_file_path) as file:
+        return json.load(file)
+
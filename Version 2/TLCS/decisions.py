@@ -0,0 +1,101 @@
+import numpy as np
+
+
+class DecisionRecorder:
+    def __init__(self):
+        self.reset()
+
+
+    def add(self, step, state, action, greedy_action, queue_length, waiting_time):
+        """
+        Record one decision of the agent (the action applied and the best one of the network) and the situation in which it was taken
+        """
+        self._steps.append(step)
+        self._states.append(state)
+        self._actions.append(action)
+        self._greedy_actions.append(greedy_action)
+        self._queue_lengths.append(queue_length)
+        self._waiting_times.append(waiting_time)
+
+
+    def reset(self):
+        """
+        Forget the decisions recorded so far, at the beginning of every episode
+        """
+        self._steps = []
+        self._states = []
+        self._actions = []
+        self._greedy_actions = []
+        self._queue_lengths = []
+        self._waiting_times = []
+
+
+    def to_arrays(self):
+        """
+        Return the decisions as a dict of compact arrays, vehicle counts stored as uint16
+        """
+        return {
+            'steps': np.array(self._steps, dtype=np.int32),
+            'states': np.clip(np.rint(self._states), 0, np.iinfo(np.uint16).max).astype(np.uint16).reshape(len(self._steps), -1),
+            'actions': np.array(self._actions, dtype=np.uint8),
+            'greedy_actions': np.array(self._greedy_actions, dtype=np.uint8),
+            'queue_lengths': np.array(self._queue_lengths, dtype=np.int32),
+            'waiting_times': np.array(self._waiting_times, dtype=np.float32)
+        }
+
+
+    def save(self, file_path, **metadata):
+        """
+        Write the decisions as compressed npz, with optional metadata (seed, model...)
+        """
+        save_decisions(file_path, self.to_arrays(), **metadata)
+
+
+    @property
+    def num_decisions(self):
+        return len(self._steps)
+
+
+def save_decisions(file_path, arrays, **metadata):
+    """
+    Write the arrays returned by DecisionRecorder.to_arrays as compressed npz, with optional metadata (seed, model...)
+    """
+    arrays = dict(arrays)
+    arrays.update(('meta_' + name, np.array(value)) for name, value in metadata.items())
+    np.savez_compressed(file_path, **arrays)
+
+
+def load_decisions(file_path):
+    """
+    Read a decisions file written by DecisionRecorder.save as a dict of arrays, metadata under 'metadata'
+    """
+    with np.load(file_path) as trace:
+        decisions = {name: trace[name] for name in trace.files if not name.startswith('meta_')}
+        decisions['metadata'] = {name[len('meta_'):]: trace[name].item() for name in trace.files if name.startswith('meta_')}
+    return decisions
+
+
+def replay_decisions(Model, decisions, num_actions):
+    """
+    Choose the greedy action of Model on every recorded state in a single batched pass
+    and compare it to the recorded greedy action (open loop: the recorded states do not react to the new choices)
+    """
+    states = decisions['states'].astype(np.float32)
+    actions = decisions['greedy_actions'].astype(np.int64)
+    q_values = Model.predict_batch(states)
+    new_actions = num_actions - 1 - np.argmax(q_values[:, ::-1], axis=1)  # ties go to the last action, as in Simulation._choose_action
+    same = new_actions == actions
+
+    confusion = np.zeros((num_actions, num_actions), dtype=np.int64)  # recorded greedy action x new action
+    np.add.at(confusion, (actions, new_actions), 1)
+
+    queue_lengths = decisions['queue_lengths']
+    return {
+        'decisions': len(actions),
+        'agreement': float(np.mean(same)) if len(actions) else float('nan'),
+        'applied_agreement': float(np.mean(new_actions == decisions['actions'])) if len(actions) else float('nan'),
+        'queue_weighted_agreement': float(np.sum(queue_lengths * same) / max(np.sum(queue_lengths), 1)),
+        'first_divergence_step': int(decisions['steps'][np.argmin(same)]) if not np.all(same) else None,
+        'confusion': confusion,
+        'new_actions': new_actions
+    }
@@ -0,0 +1,98 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import numpy as np
+from shutil import copyfile
+
+from testing_simulation import Simulation
+from generator import TrafficGenerator
+from numpy_model import NumpyTestModel, quantize_weights
+from evaluation import episode_arrays, episode_metrics
+from distillation import sample_states, distill, action_agreement, decision_latency, model_size
+from utils import import_distill_configuration, set_sumo, set_test_path
+
+
+if __name__ == "__main__":
+
+    config = import_distill_configuration(config_file='distill_settings.ini')
+    sumo_cmd = set_sumo(config['gui'], config['sumocfg_file_name'], config['max_steps'])
+    model_path, _ = set_test_path(config['models_path_name'], config['model_to_test'])
+    student_path = os.path.join(model_path, 'student', '')
+    student_int8_path = os.path.join(model_path, 'student_int8', '')
+    os.makedirs(os.path.dirname(student_int8_path), exist_ok=True)
+
+    Teacher = NumpyTestModel(
+        input_dim=config['num_states'],
+        model_path=model_path
+    )
+
+    from model import TrainModel  # tensorflow is imported only once the configuration is read
+    Student = TrainModel(
+        config['num_layers'],
+        config['width_layers'],
+        config['batch_size'],
+        config['learning_rate'],
+        input_dim=config['num_states'],
+        output_dim=config['num_actions']
+    )
+
+    TrafficGen = TrafficGenerator(
+        config['max_steps'],
+        config['n_cars_generated']
+    )
+
+    print('\n----- Distilling model', config['model_to_test'])
+    states = sample_states(config['num_samples'], config['num_states'], config['max_count'], seed=0)
+    distill(Teacher, Student, states, config['training_epochs'])
+    Student.save_model(student_path)
+    copyfile(src='distill_settings.ini', dst=os.path.join(student_path, 'distill_settings.ini'))
+
+    candidates = [('teacher', model_path), ('student', student_path)]
+    if config['quantize']:
+        quantize_weights(os.path.join(student_path, 'trained_model.npz'), os.path.join(student_int8_path, 'trained_model.npz'))
+        candidates.append(('student_int8', student_int8_path))
+
+    eval_states = sample_states(10000, config['num_states'], config['max_count'], seed=1)
+    results = []
+    for name, path in candidates:
+        print('\n----- Evaluating', name)
+        Model = NumpyTestModel(
+            input_dim=config['num_states'],
+            model_path=path
+        )
+        avg_waiting_times = []
+        for seed in config['episode_seeds']:
+            Sim = Simulation(
+                Model,
+                TrafficGen,
+                sumo_cmd,
+                config['max_steps'],
+                config['green_duration'],
+                config['yellow_duration'],
+                config['num_states'],
+                config['num_actions']
+            )
+            simulation_time = Sim.run(seed)
+            episode = episode_arrays(simulation_time, Sim.reward_episode, Sim.queue_length_episode, Sim.sum_waiting_times, {})
+            avg_waiting_times.append(episode_metrics(config, seed, episode)['average_waiting_time'])  # same metric as evaluation_main.py
+        results.append({
+            'name': name,
+            'parameters': Model.num_parameters,
+            'size_kb': round(model_size(path) / 1024, 1),
+            'latency_us': decision_latency(Model, eval_states[:1000]),
+            'agreement': round(action_agreement(Teacher, Model, eval_states), 3),
+            'avg_waiting_time': round(float(np.mean(avg_waiting_times)), 2)
+        })
+
+    teacher_wait = results[0]['avg_waiting_time']
+    with open(os.path.join(student_path, 'distillation_report.txt'), "w") as report:
+        print('seeds:', config['episode_seeds'], file=report)
+        print('%-14s %12s %10s %12s %10s %18s %10s' % ('model', 'parameters', 'size (KB)', 'latency (us)', 'agreement', 'avg wait/car (s)', 'change'), file=report)
+        for result in results:
+            change = 100 * (result['avg_waiting_time'] - teacher_wait) / teacher_wait if teacher_wait else 0
+            print('%-14s %12d %10.1f %12.1f %10.3f %18.2f %9.1f%%' % (result['name'], result['parameters'], result['size_kb'], result['latency_us'], result['agreement'], result['avg_waiting_time'], change), file=report)
+
+    with open(os.path.join(student_path, 'distillation_report.txt')) as report:
+        print('\n' + report.read())
+    print("----- Distillation info saved at:", student_path)
@@ -0,0 +1,53 @@
+import numpy as np
+import os
+import timeit
+
+
+def sample_states(num_samples, num_states, max_count, seed):
+    """
+    Sample synthetic intersection states, mostly light traffic but reaching up to max_count vehicles per lane group
+    """
+    rng = np.random.RandomState(seed)
+    traffic_level = rng.uniform(0, max_count, size=(num_samples, 1))  # one traffic intensity per state
+    states = rng.poisson(traffic_level * rng.uniform(size=(num_samples, num_states)))
+    return np.minimum(states, max_count).astype(np.float32)
+
+
+def distill(Teacher, Student, states, training_epochs):
+    """
+    Train the student network to reproduce the Q-values predicted by the teacher on the given states
+    """
+    q_teacher = np.concatenate([Teacher.predict_batch(states[start:start + 10000]) for start in range(0, len(states), 10000)])
+    for epoch in range(training_epochs):
+        order = np.random.permutation(len(states))
+        for start in range(0, len(states), Student.batch_size):
+            batch = order[start:start + Student.batch_size]
+            Student.train_batch(states[batch], q_teacher[batch])
+        print('Epoch', epoch + 1, 'of', training_epochs)
+
+
+def action_agreement(Teacher, Student, states):
+    """
+    Fraction of states where the student picks the same greedy action as the teacher
+    """
+    return np.mean(np.argmax(Teacher.predict_batch(states), axis=1) == np.argmax(Student.predict_batch(states), axis=1))
+
+
+def decision_latency(Model, states, repeats=3):
+    """
+    Median time in microseconds of a single state prediction, as done by the simulation at every decision
+    """
+    timings = []
+    for _ in range(repeats):
+        start_time = timeit.default_timer()
+        for state in states:
+            Model.predict_one(state)
+        timings.append((timeit.default_timer() - start_time) / len(states))
+    return round(np.median(timings) * 1e6, 1)
+
+
+def model_size(model_folder_path):
+    """
+    Size in bytes of the exported npz weights of a model
+    """
+    return os.path.getsize(os.path.join(model_folder_path, 'trained_model.npz'))
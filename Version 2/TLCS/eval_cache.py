@@ -0,0 +1,92 @@
+import glob
+import hashlib
+import json
+import os
+import numpy as np
+
+
+CACHE_VERSION = 1  # to be increased when a change of the simulation code changes the results
+
+# settings the result of a test episode depends on
+SETTINGS_KEYS = ['max_steps', 'n_cars_generated', 'green_duration', 'yellow_duration', 'num_states', 'num_actions',
+                 'starvation_threshold', 'inference_backend', 'traci_backend', 'sumocfg_file_name']
+
+# files of a model folder the decisions depend on, those present are hashed
+MODEL_FILES = ['trained_model.npz', 'model_manifest.json', 'trained_model.h5', 'policy_table.npz']
+
+
+class EvaluationCache:
+    def __init__(self, path):
+        self._path = path
+        os.makedirs(path, exist_ok=True)
+
+
+    def get(self, key):
+        """
+        Return the arrays stored under key, None if the evaluation has not been cached
+        """
+        file_path = os.path.join(self._path, key + '.npz')
+        if not os.path.isfile(file_path):
+            return None
+        with np.load(file_path) as entry:
+            return {name: entry[name] for name in entry.files}
+
+
+    def put(self, key, **arrays):
+        """
+        Store the arrays of an evaluation under key, replacing the file atomically
+        """
+        tmp_file_path = os.path.join(self._path, key + '.tmp.npz')
+        np.savez_compressed(tmp_file_path, **arrays)
+        os.replace(tmp_file_path, os.path.join(self._path, key + '.npz'))
+
+
+    def clear(self):
+        """
+        Remove every cached evaluation, return how many there were
+        """
+        file_paths = glob.glob(os.path.join(self._path, '*.npz'))
+        for file_path in file_paths:
+            os.remove(file_path)
+        return len(file_paths)
+
+
+def evaluation_key(model_folder_path, seed, config):
+    """
+    Key of the evaluation of a model on a seed: hash of the model weights, the seed, the generator and simulation settings,
+    and the network files, so that any change of them gives a new key
+    """
+    inputs = {
+        'version': CACHE_VERSION,
+        'model': model_hash(model_folder_path),
+        'seed': seed,
+        'settings': {key: config[key] for key in SETTINGS_KEYS},
+        'network': {os.path.basename(file_path): file_hash(file_path) for file_path in sorted(glob.glob(os.path.join('intersection', '*'))) if not file_path.endswith('.rou.xml')}
+    }
+    if config['traci_backend'] == 'trace':
+        inputs['trace'] = file_hash(config['trace_file'])
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+def model_hash(model_folder_path):
+    """
+    Hash of the content of the weight files of a model folder
+    """
+    digest = hashlib.sha256()
+    for file_name in MODEL_FILES:
+        file_path = os.path.join(model_folder_path, file_name)
+        if os.path.isfile(file_path):
+            digest.update(file_name.encode())
+            digest.update(file_hash(file_path).encode())
+    return digest.hexdigest()
+
+
+def file_hash(file_path):
+    """
+    Hash of the content of a file, read by chunks
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,202 @@
+import math
+import os
+import sys
+import numpy as np
+
+from generator import TrafficGenerator
+from starvation import SERVED_TRAVERSALS
+
+
+# two-sided 95% critical values of the Student t distribution, by degrees of freedom
+T_95 = {1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262, 10: 2.228,
+        11: 2.201, 12: 2.179, 13: 2.160, 14: 2.145, 15: 2.131, 16: 2.120, 17: 2.110, 18: 2.101, 19: 2.093, 20: 2.086,
+        25: 2.060, 30: 2.042, 40: 2.021, 60: 2.000, 120: 1.980}
+
+METRICS = ['total_reward', 'average_queue_length', 'total_waiting_time', 'average_waiting_time']
+
+_sweep_models = {}  # models loaded once in every worker of a sweep
+
+
+def load_test_model(config, model_path):
+    """
+    Load the model to test with the inference backend of the configuration
+    """
+    if config['inference_backend'] in ('numpy', 'table'):
+        from numpy_model import NumpyTestModel as TestModel
+    else:
+        from model import TestModel
+
+    Model = TestModel(
+        input_dim=config['num_states'],
+        model_path=model_path
+    )
+
+    if config['inference_backend'] == 'table':
+        from policy_table import TableTestModel
+        Model = TableTestModel(
+            input_dim=config['num_states'],
+            num_actions=config['num_actions'],
+            model_path=model_path,
+            Fallback=Model
+        )
+
+    if config['cache_size'] > 0:
+        from model_cache import CachedModel
+        Model = CachedModel(Model, config['cache_size'])
+    return Model
+
+
+def check_test_model(config, model_path):
+    """
+    Exit if the model of the folder cannot be loaded with the inference backend of the configuration.
+    Called before starting the workers, which would not report the error
+    """
+    if config['inference_backend'] in ('numpy', 'table'):
+        try:
+            load_test_model(config, model_path)  # no tensorflow needed, the weights and the table are checked as the workers load them
+        except SystemExit as error:
+            sys.exit('%s: %s' % (model_path, error))
+    elif not any(os.path.isfile(os.path.join(model_path, file_name)) for file_name in ('model_manifest.json', 'trained_model.h5')):
+        sys.exit('Model weights not found in ' + model_path)
+
+
+def load_worker_model(config, model_path):
+    """
+    Load the model to test in a worker process, raising instead of exiting so that the pool passes the error to the parent
+    """
+    try:
+        return load_test_model(config, model_path)
+    except SystemExit as error:
+        raise RuntimeError('%s: %s' % (model_path, error)) from None
+
+
+def evaluate_seed(config, model_path, sumo_cmd, seed, route_file):
+    """
+    Run the test episode of one seed with its own route file and SUMO instance, and return its metrics.
+    Meant to be called in a worker process
+    """
+    TrafficGen = TrafficGenerator(
+        config['max_steps'],
+        config['n_cars_generated'],
+        route_file
+    )
+    result = run_test_episode(config, load_worker_model(config, model_path), TrafficGen, sumo_cmd, seed, route_file)
+    os.remove(route_file)
+    return result
+
+
+def init_sweep_worker(config, models):
+    """
+    Load every model of a sweep once per worker process, models being a dict name -> (path, num_states, num_actions)
+    """
+    for name, (path, num_states, num_actions) in models.items():
+        try:
+            _sweep_models[name] = (load_worker_model(model_config(config, num_states, num_actions), path), num_states, num_actions)
+        except Exception as error:  # raised by the jobs of the model: the pool restarts a worker whose initializer fails
+            _sweep_models[name] = error
+
+
+def model_config(config, num_states, num_actions):
+    """
+    Return the testing configuration adapted to a model trained with other numbers of states and actions
+    """
+    threshold = config['starvation_threshold'] if num_actions == len(SERVED_TRAVERSALS) else 0  # the guard needs the 8 actions
+    return dict(config, num_states=num_states, num_actions=num_actions, starvation_threshold=threshold)
+
+
+def evaluate_model_seed(config, name, sumo_cmd, seed, route_file):
+    """
+    Run the test episode of one seed with a model loaded by init_sweep_worker, on a route file already generated
+    """
+    if isinstance(_sweep_models[name], Exception):
+        raise _sweep_models[name]
+    Model, num_states, num_actions = _sweep_models[name]
+    result = run_test_episode(model_config(config, num_states, num_actions), Model, PregeneratedRoutes(), sumo_cmd, seed, route_file)
+    result['model'] = name
+    return result
+
+
+def run_test_episode(config, Model, TrafficGen, sumo_cmd, seed, route_file):
+    """
+    Run the test episode of one seed on route_file and return its metrics, with the arrays of the episode
+    to be stored in the evaluation cache under the key 'episode'
+    """
+    from testing_simulation import Simulation
+    from decisions import DecisionRecorder
+    from utils import set_traci
+
+    Recorder = DecisionRecorder()
+    Sim = Simulation(
+        Model,
+        TrafficGen,
+        sumo_cmd + ["--route-files", route_file],
+        config['max_steps'],
+        config['green_duration'],
+        config['yellow_duration'],
+        config['num_states'],
+        config['num_actions'],
+        Traci=set_traci(config['traci_backend'], config['trace_file']),
+        Recorder=Recorder,
+        starvation_threshold=config['starvation_threshold']
+    )
+
+    simulation_time = Sim.run(seed)
+    episode = episode_arrays(simulation_time, Sim.reward_episode, Sim.queue_length_episode, Sim.sum_waiting_times, Recorder.to_arrays())
+    return dict(episode_metrics(config, seed, episode), episode=episode)
+
+
+def episode_arrays(simulation_time, reward_episode, queue_length_episode, sum_waiting_times, decisions):
+    """
+    Return the arrays of a test episode as stored in the evaluation cache, the decisions prefixed with 'decision_'
+    """
+    episode = {
+        'simulation_time': np.array(simulation_time),
+        'reward_episode': np.array(reward_episode, dtype=np.float64),
+        'queue_length_episode': np.array(queue_length_episode, dtype=np.float64),
+        'sum_waiting_times': np.array(sum_waiting_times, dtype=np.float64)
+    }
+    episode.update(('decision_' + name, array) for name, array in decisions.items())
+    return episode
+
+
+def episode_metrics(config, seed, episode):
+    """
+    Return the metrics of a test episode from its arrays, simulated or read from the evaluation cache
+    """
+    reward_episode = episode['reward_episode']
+    total_waiting_time = episode['sum_waiting_times'][-1] if len(episode['sum_waiting_times']) else 0.0
+    return {
+        'seed': seed,
+        'simulation_time': float(episode['simulation_time']),
+        'total_reward': float(np.sum(reward_episode)),
+        'average_queue_length': float(-np.mean(reward_episode)),  # the reward is minus the queue length at every decision
+        'total_waiting_time': float(total_waiting_time),
+        'average_waiting_time': float(total_waiting_time / config['n_cars_generated'])
+    }
+
+
+class PregeneratedRoutes:  # stands for the TrafficGenerator when the route file of the seed is already written
+    def generate_routefile(self, seed):
+        pass
+
+
+def summarize(results):
+    """
+    Return the mean, standard deviation and 95% confidence interval of every metric over the seeds
+    """
+    summary = {'seeds': [result['seed'] for result in results]}
+    for metric in METRICS:
+        values = np.array([result[metric] for result in results])
+        mean = float(np.mean(values))
+        std = float(np.std(values, ddof=1)) if len(values) > 1 else 0.0
+        half_width = t_critical_95(len(values) - 1) * std / math.sqrt(len(values)) if len(values) > 1 else float('nan')
+        summary[metric] = {'mean': mean, 'std': std, 'ci95_low': mean - half_width, 'ci95_high': mean + half_width}
+    return summary
+
+
+def t_critical_95(degrees_of_freedom):
+    """
+    Two-sided 95% critical value of the t distribution, from the closest tabulated degrees of freedom below
+    """
+    tabulated = [df for df in sorted(T_95) if df <= degrees_of_freedom]
+    return T_95[tabulated[-1]] if degrees_of_freedom <= 120 else 1.960
@@ -0,0 +1,73 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import csv
+import argparse
+import json
+import timeit
+import multiprocessing
+from shutil import copyfile
+
+from evaluation import evaluate_seed, check_test_model, episode_metrics, summarize, METRICS
+from eval_cache import EvaluationCache, evaluation_key
+from catalog import open_catalog
+from utils import import_test_configuration, set_sumo, set_test_path
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Evaluate the model to test on several seeds in parallel')
+    parser.add_argument('--refresh', action='store_true', help='simulate every seed again even if its result is cached')
+    parser.add_argument('--clear-cache', action='store_true', help='remove every cached evaluation first')
+    args = parser.parse_args()
+
+    config = import_test_configuration(config_file='testing_settings.ini')
+    sumo_cmd = set_sumo(config['gui'], config['sumocfg_file_name'], config['max_steps'], config['traci_backend'])
+    model_path, plot_path = set_test_path(config['models_path_name'], config['model_to_test'])
+    eval_path = os.path.join(plot_path, 'evaluation', '')
+    os.makedirs(eval_path, exist_ok=True)
+
+    Cache = EvaluationCache(config['eval_cache_path_name']) if config['eval_cache_path_name'] else None
+    if Cache is not None and args.clear_cache:
+        print('Removed', Cache.clear(), 'cached evaluations')
+
+    # the seeds already evaluated with the same model, settings and network are read from the cache
+    keys = {seed: evaluation_key(model_path, seed, config) for seed in config['eval_seeds']} if Cache is not None else {}
+    results = {}
+    for seed in keys:
+        episode = Cache.get(keys[seed]) if not args.refresh else None
+        if episode is not None:
+            results[seed] = episode_metrics(config, seed, episode)
+
+    # every worker has its own route file, passed to its SUMO instance with --route-files
+    jobs = [(config, model_path, sumo_cmd, seed, os.path.join(eval_path, 'routes_%d.rou.xml' % seed)) for seed in config['eval_seeds'] if seed not in results]
+
+    print('\n----- Evaluating model', config['model_to_test'], 'on', len(jobs), 'seeds with', config['eval_workers'], 'workers,', len(results), 'seeds cached')
+    start_time = timeit.default_timer()
+    if jobs:
+        check_test_model(config, model_path)
+        with multiprocessing.get_context('spawn').Pool(config['eval_workers']) as pool:  # spawn: no tensorflow or traci state inherited
+            for result in pool.starmap(evaluate_seed, jobs):
+                episode = result.pop('episode')
+                if Cache is not None:
+                    Cache.put(keys[result['seed']], **episode)
+                results[result['seed']] = result
+    results = [results[seed] for seed in config['eval_seeds']]
+    print('Evaluation time:', round(timeit.default_timer() - start_time, 1), 's - Sum of the simulation times:', round(sum(result['simulation_time'] for result in results), 1), 's')
+
+    summary = summarize(results)
+    for metric in METRICS:
+        stats = summary[metric]
+        print('%-22s %14.2f  95%% CI [%.2f, %.2f]' % (metric, stats['mean'], stats['ci95_low'], stats['ci95_high']))
+
+    with open(os.path.join(eval_path, 'evaluation_summary.json'), 'w') as file:
+        json.dump(dict(summary, model=config['model_to_test']), file, indent=4)
+    with open(os.path.join(eval_path, 'evaluation_seeds.csv'), 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=['seed', 'simulation_time'] + METRICS)
+        writer.writeheader()
+        writer.writerows(results)
+    copyfile(src='testing_settings.ini', dst=os.path.join(eval_path, 'testing_settings.ini'))
+    open_catalog(model_path).update_run(model_path, evaluation=summary)
+
+    print("----- Evaluation info saved at:", eval_path)
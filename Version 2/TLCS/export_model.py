@@ -0,0 +1,27 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import argparse
+
+from utils import import_test_configuration, set_test_path
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Export the model to test as npz weights with a json manifest')
+    parser.add_argument('--diagram', action='store_true', help='also draw the model architecture as model_structure.png')
+    args = parser.parse_args()
+
+    config = import_test_configuration(config_file='testing_settings.ini')
+    model_path, _ = set_test_path(config['models_path_name'], config['model_to_test'])
+
+    from model import TestModel, save_model_diagram  # tensorflow is imported only once the configuration is read
+    Model = TestModel(
+        input_dim=config['num_states'],
+        model_path=model_path
+    )
+
+    Model.export_weights(model_path)
+    if args.diagram:
+        save_model_diagram(model_path)
+    print("----- Weights exported at:", model_path)
@@ -0,0 +1,327 @@
+import math
+import os
+import xml.etree.ElementTree as ET
+import numpy as np
+
+from network import network_of
+
+
+class FakeTraci:
+    def __init__(self, headway=2, seed=0):
+        self._headway = headway  # seconds between two vehicles leaving a queue on green
+        self._seed = seed
+        self._connections = {}  # label -> independent FakeTraci, as the labeled connections of traci
+        self.simulation = _Domain(getTime=lambda: self._step, getMinExpectedNumber=lambda: len(self._pending) + len(self._vehicles))
+        self.vehicle = _Domain(getIDList=self._get_id_list, getAccumulatedWaitingTime=lambda car_id: self._vehicles[car_id]['wait'], getRoadID=lambda car_id: self._vehicles[car_id]['road'])
+        self.lane = _Domain(getLastStepVehicleNumber=lambda lane_id: self._lane_number.get(lane_id, 0))
+        self.edge = _Domain(getLastStepHaltingNumber=lambda edge_id: self._edge_halting.get(edge_id, 0))
+        self.trafficlight = _Domain(setPhase=self._set_phase)
+
+
+    def start(self, cmd, label='default', **kwargs):
+        """
+        Load the network and the routes of the sumo configuration given with -c in the command line
+        (the routes can be replaced with --route-files, as in sumo)
+        """
+        if label != 'default':
+            self._connections[label] = FakeTraci(self._headway, self._seed)
+            self._connections[label].start(cmd)
+            return
+
+        config_file = cmd[cmd.index('-c') + 1]
+        net_file, route_file = _read_sumo_config(config_file)
+        if '--route-files' in cmd:
+            route_file = cmd[cmd.index('--route-files') + 1]
+
+        self._load_network(net_file)
+        self._rng = np.random.RandomState(self._seed)
+        self._pending = _read_routes(route_file)  # vehicles not departed yet, by depart time
+        self._vehicles = {}  # id -> {'road', 'lane', 'link', 'arrival', 'wait', 'queued', 'exit'}
+        self._queues = {lane_id: [] for lane_id in self._lanes}
+        self._next_discharge = {lane_id: 0 for lane_id in self._lanes}
+        self._step = 0
+        self._tl_state = {tl_id: phases[0] for tl_id, phases in self._phases.items()}
+        self._update_counts()
+
+
+    def getConnection(self, label='default'):
+        return self if label == 'default' else self._connections[label]
+
+
+    def close(self):
+        self._vehicles = {}
+        self._pending = []
+
+
+    def simulationStep(self):
+        """
+        Advance one second: departures, arrivals at the stop line, discharge of the queues on green, exits
+        """
+        self._step += 1
+
+        while self._pending and self._pending[-1][0] <= self._step:
+            _, car_id, edges = self._pending.pop()
+            self._depart(car_id, edges)
+
+        for car_id in list(self._vehicles):
+            vehicle = self._vehicles[car_id]
+            if vehicle['exit'] is not None:
+                if vehicle['exit'] <= self._step:
+                    del self._vehicles[car_id]  # left the network
+            elif vehicle['queued']:
+                vehicle['wait'] += 1
+            elif vehicle['arrival'] <= self._step:
+                vehicle['queued'] = True
+                self._queues[vehicle['lane']].append(car_id)
+
+        for lane_id, queue in self._queues.items():
+            if queue and self._next_discharge[lane_id] <= self._step:
+                vehicle = self._vehicles[queue[0]]
+                tl_id, link_index = vehicle['link']
+                if self._tl_state[tl_id][link_index] in 'Gg':
+                    queue.pop(0)
+                    vehicle['queued'] = False
+                    vehicle['road'] = vehicle['next_road']
+                    vehicle['exit'] = self._step + self._travel_steps[vehicle['next_road']]
+                    self._next_discharge[lane_id] = self._step + self._headway
+
+        self._update_counts()
+
+
+    def _depart(self, car_id, edges):
+        """
+        Insert a vehicle at the beginning of its first edge, on a lane leading to its next edge
+        """
+        lanes = [lane_id for lane_id in self._edge_lanes[edges[0]] if (lane_id, edges[1]) in self._links]
+        lane_id = lanes[self._rng.randint(len(lanes))]
+        self._vehicles[car_id] = {
+            'road': edges[0],
+            'next_road': edges[1],
+            'lane': lane_id,
+            'link': self._links[(lane_id, edges[1])],
+            'arrival': self._step + self._travel_steps[edges[0]],
+            'wait': 0.0,
+            'queued': False,
+            'exit': None
+        }
+
+
+    def _update_counts(self):
+        """
+        Cache the per lane vehicle numbers and the per edge halting numbers of the current step
+        """
+        self._lane_number = {}
+        for vehicle in self._vehicles.values():
+            if vehicle['exit'] is None:
+                self._lane_number[vehicle['lane']] = self._lane_number.get(vehicle['lane'], 0) + 1
+        self._edge_halting = {}
+        for lane_id, queue in self._queues.items():
+            edge_id = self._lane_edge[lane_id]
+            self._edge_halting[edge_id] = self._edge_halting.get(edge_id, 0) + len(queue)
+
+
+    def _get_id_list(self):
+        return list(self._vehicles)
+
+
+    def _set_phase(self, tl_id, phase_index):
+        self._tl_state[tl_id] = self._phases[tl_id][phase_index]
+
+
+    def _load_network(self, net_file):
+        """
+        Read lanes, travel times, signalized connections and traffic light phases from the net file
+        """
+        root = ET.parse(net_file).getroot()
+        self._lanes = []
+        self._lane_edge = {}
+        self._edge_lanes = {}
+        self._travel_steps = {}
+        for edge in root.iter('edge'):
+            if edge.get('function') == 'internal':
+                continue
+            lanes = edge.findall('lane')
+            self._edge_lanes[edge.get('id')] = [lane.get('id') for lane in lanes]
+            self._travel_steps[edge.get('id')] = int(math.ceil(float(lanes[0].get('length')) / float(lanes[0].get('speed'))))
+            for lane in lanes:
+                self._lanes.append(lane.get('id'))
+                self._lane_edge[lane.get('id')] = edge.get('id')
+
+        self._links = {}  # (from lane, to edge) -> (traffic light, link index)
+        for connection in root.iter('connection'):
+            if connection.get('tl') is not None:
+                lane_id = connection.get('from') + '_' + connection.get('fromLane')
+                self._links[(lane_id, connection.get('to'))] = (connection.get('tl'), int(connection.get('linkIndex')))
+
+        self._phases = {tl.get('id'): [phase.get('state') for phase in tl.iter('phase')] for tl in root.iter('tlLogic')}
+
+
+class TraceRecorder:
+    def __init__(self, traci_module, lane_ids=None, edge_ids=None):
+        self._traci = traci_module
+        self._lane_ids = lane_ids  # by default the lanes and edges the simulations observe in the network of the started command
+        self._edge_ids = edge_ids
+        self.simulation = traci_module.simulation
+        self.vehicle = traci_module.vehicle
+        self.lane = traci_module.lane
+        self.edge = traci_module.edge
+        self.trafficlight = traci_module.trafficlight
+        self._clear()
+
+
+    def start(self, cmd, label='default', **kwargs):
+        self._clear()
+        Network = network_of(cmd)
+        self._lane_ids = list(self._lane_ids if self._lane_ids is not None else Network.state_lanes)
+        self._edge_ids = list(self._edge_ids if self._edge_ids is not None else Network.incoming_edges)
+        result = self._traci.start(cmd, label=label, **kwargs)
+        self._connection = self._traci.getConnection(label)
+        self.simulation = self._connection.simulation
+        self.vehicle = self._connection.vehicle
+        self.lane = self._connection.lane
+        self.edge = self._connection.edge
+        self.trafficlight = self._connection.trafficlight
+        self._snapshot()
+        return result
+
+
+    def getConnection(self, label='default'):
+        return self  # records the connection of the last start
+
+
+    def close(self):
+        return self._connection.close()
+
+
+    def simulationStep(self, *args):
+        result = self._connection.simulationStep(*args)
+        self._snapshot()
+        return result
+
+
+    def save(self, file_path):
+        """
+        Write the recorded observations as npz, vehicles of every step stored one after the other
+        """
+        vehicle_names = sorted(set(self._vehicle_ids))
+        vehicle_index = {name: i for i, name in enumerate(vehicle_names)}
+        road_names = sorted(set(self._vehicle_roads))
+        road_index = {name: i for i, name in enumerate(road_names)}
+        np.savez_compressed(
+            file_path,
+            lane_ids=np.array(self._lane_ids),
+            edge_ids=np.array(self._edge_ids),
+            lane_numbers=np.array(self._lane_numbers, dtype=np.int32),
+            edge_halting=np.array(self._edge_halting, dtype=np.int32),
+            vehicle_offsets=np.cumsum([0] + self._vehicle_counts),
+            vehicle_names=np.array(vehicle_names),
+            vehicle_ids=np.array([vehicle_index[name] for name in self._vehicle_ids], dtype=np.int32),
+            road_names=np.array(road_names),
+            vehicle_roads=np.array([road_index[name] for name in self._vehicle_roads], dtype=np.int32),
+            vehicle_waits=np.array(self._vehicle_waits, dtype=np.float32)
+        )
+
+
+    def _clear(self):
+        self._lane_numbers = []
+        self._edge_halting = []
+        self._vehicle_counts = []
+        self._vehicle_ids = []
+        self._vehicle_roads = []
+        self._vehicle_waits = []
+
+
+    def _snapshot(self):
+        """
+        Record every observation the simulations can read at the current step
+        """
+        self._lane_numbers.append([self.lane.getLastStepVehicleNumber(lane_id) for lane_id in self._lane_ids])
+        self._edge_halting.append([self.edge.getLastStepHaltingNumber(edge_id) for edge_id in self._edge_ids])
+        car_list = self.vehicle.getIDList()
+        self._vehicle_counts.append(len(car_list))
+        for car_id in car_list:
+            self._vehicle_ids.append(car_id)
+            self._vehicle_roads.append(self.vehicle.getRoadID(car_id))
+            self._vehicle_waits.append(self.vehicle.getAccumulatedWaitingTime(car_id))
+
+
+class TraceTraci:
+    def __init__(self, trace_file):
+        self._trace_file = trace_file
+        self._connections = {}
+        with np.load(trace_file) as trace:
+            self._lane_index = {lane_id: i for i, lane_id in enumerate(trace['lane_ids'].tolist())}
+            self._edge_index = {edge_id: i for i, edge_id in enumerate(trace['edge_ids'].tolist())}
+            self._lane_numbers = trace['lane_numbers']
+            self._edge_halting = trace['edge_halting']
+            self._vehicle_offsets = trace['vehicle_offsets']
+            self._vehicle_names = trace['vehicle_names'].tolist()
+            self._vehicle_ids = trace['vehicle_ids']
+            self._road_names = trace['road_names'].tolist()
+            self._vehicle_roads = trace['vehicle_roads']
+            self._vehicle_waits = trace['vehicle_waits']
+        self._row = 0
+        self.simulation = _Domain(getTime=lambda: self._row)
+        self.vehicle = _Domain(getIDList=lambda: list(self._vehicles()), getAccumulatedWaitingTime=lambda car_id: self._vehicles()[car_id][1], getRoadID=lambda car_id: self._vehicles()[car_id][0])
+        self.lane = _Domain(getLastStepVehicleNumber=lambda lane_id: int(self._lane_numbers[self._row, self._lane_index[lane_id]]))
+        self.edge = _Domain(getLastStepHaltingNumber=lambda edge_id: int(self._edge_halting[self._row, self._edge_index[edge_id]]))
+        self.trafficlight = _Domain(setPhase=lambda tl_id, phase_index: None)  # open loop: the trace does not react
+
+
+    def start(self, cmd, label='default', **kwargs):
+        if label != 'default':
+            self._connections[label] = TraceTraci(self._trace_file)
+            self._connections[label].start(cmd)
+            return
+        self._row = 0
+        self._cached_row = None
+
+
+    def getConnection(self, label='default'):
+        return self if label == 'default' else self._connections[label]
+
+
+    def close(self):
+        pass
+
+
+    def simulationStep(self, *args):
+        self._row = min(self._row + 1, len(self._lane_numbers) - 1)
+
+
+    def _vehicles(self):
+        """
+        Vehicles of the current step: id -> (road id, accumulated waiting time)
+        """
+        if self._cached_row != self._row:
+            start, end = self._vehicle_offsets[self._row], self._vehicle_offsets[self._row + 1]
+            self._cached_vehicles = {self._vehicle_names[vehicle]: (self._road_names[road], float(wait)) for vehicle, road, wait in zip(self._vehicle_ids[start:end], self._vehicle_roads[start:end], self._vehicle_waits[start:end])}
+            self._cached_row = self._row
+        return self._cached_vehicles
+
+
+class _Domain:
+    def __init__(self, **methods):
+        self.__dict__.update(methods)
+
+
+def _read_sumo_config(config_file):
+    """
+    Return the net file and the route file of a sumo configuration, relative to its folder
+    """
+    root = ET.parse(config_file).getroot()
+    folder = os.path.dirname(config_file)
+    net_file = root.find('input/net-file').get('value')
+    route_file = root.find('input/route-files').get('value')
+    return os.path.join(folder, net_file), os.path.join(folder, route_file)
+
+
+def _read_routes(route_file):
+    """
+    Return the vehicles of a route file as (depart, id, edges), the first to depart last
+    """
+    root = ET.parse(route_file).getroot()
+    routes = {route.get('id'): route.get('edges').split() for route in root.iter('route')}
+    vehicles = [(int(float(vehicle.get('depart'))), vehicle.get('id'), routes[vehicle.get('route')]) for vehicle in root.iter('vehicle')]
+    vehicles.sort(key=lambda vehicle: vehicle[0], reverse=True)
+    return vehicles
@@ -2,18 +2,19 @@ import numpy as np
 import math
 
 class TrafficGenerator:
-    def __init__(self, max_steps, n_cars_generated):
+    def __init__(self, max_steps, n_cars_generated, route_file="intersection/episode_routes.rou.xml"):
         self._n_cars_generated = n_cars_generated  # how many cars per episode
         self._max_steps = max_steps
+        self._route_file = route_file  # give sumo the same file with --route-files when it is not the default one
 
     def generate_routefile(self, seed):
         """
         Generation of the route of every car for one episode
         """
-        np.random.seed(seed)  # make tests reproducible
+        rng = np.random.RandomState(seed)  # make tests reproducible, with its own generator so that simulations can run side by side
 
         # the generation of cars is distributed according to a weibull distribution
-        timings = np.random.weibull(2, self._n_cars_generated)
+        timings = rng.weibull(2, self._n_cars_generated)
         timings = np.sort(timings)
 
         # reshape the distribution to fit the interval 0:max_steps
@@ -28,7 +29,7 @@ class TrafficGenerator:
         car_gen_steps = np.rint(car_gen_steps)  # round every value to int -> effective steps when a car will be generated
 
         # produce the file for cars generation, one car per line
-        with open("intersection/episode_routes.rou.xml", "w") as routes:
+        with open(self._route_file, "w") as routes:
             print("""<routes>
             <vType accel="1.0" decel="4.5" id="standard_car" length="5.0" minGap="2.5" maxSpeed="25" sigma="0.5" />
 
@@ -46,9 +47,9 @@ class TrafficGenerator:
             <route id="S_E" edges="S2TL TL2E"/>""", file=routes)
 
             for car_counter, step in enumerate(car_gen_steps):
-                straight_or_turn = np.random.uniform()
+                straight_or_turn = rng.uniform()
                 if straight_or_turn < 0.75:  # choose direction: straight or turn - 75% of times the car goes straight
-                    route_straight = np.random.randint(1, 5)  # choose a random source & destination
+                    route_straight = rng.randint(1, 5)  # choose a random source & destination
                     if route_straight == 1:
                         print('    <vehicle id="W_E_%i" type="standard_car" route="W_E" depart="%s" departLane="random" departSpeed="10" />' % (car_counter, step), file=routes)
                     elif route_straight == 2:
@@ -58,7 +59,7 @@ class TrafficGenerator:
                     else:
                         print('    <vehicle id="S_N_%i" type="standard_car" route="S_N" depart="%s" departLane="random" departSpeed="10" />' % (car_counter, step), file=routes)
                 else:  # car that turn -25% of the time the car turns
-                    route_turn = np.random.randint(1, 9)  # choose random source source & destination
+                    route_turn = rng.randint(1, 9)  # choose random source source & destination
                     if route_turn == 1:
                         print('    <vehicle id="W_N_%i" type="standard_car" route="W_N" depart="%s" departLane="random" departSpeed="10" />' % (car_counter, step), file=routes)
                     elif route_turn == 2:
@@ -1,8 +1,10 @@
 import random
+import numpy as np
 
 class Memory:
     def __init__(self, size_max, size_min):
         self._samples = []
+        self._targets = []  # cached max Q(next_state) of every sample, None until computed
         self._size_max = size_max
         self._size_min = size_min
 
@@ -12,8 +14,10 @@ class Memory:
         Add a sample into the memory
         """
         self._samples.append(sample)
+        self._targets.append(None)
         if self._size_now() > self._size_max:
             self._samples.pop(0)  # if the length is greater than the size of memory, remove the oldest element
+            self._targets.pop(0)
 
 
     def get_samples(self, n):
@@ -29,8 +33,51 @@ class Memory:
             return random.sample(self._samples, n)  # get "batch size" number of samples
 
 
+    def get_samples_with_targets(self, n):
+        """
+        Get n samples randomly from the memory, together with their cached target values
+        """
+        if self._size_now() < self._size_min:
+            return [], []
+
+        indexes = random.sample(range(self._size_now()), min(n, self._size_now()))
+        return [self._samples[i] for i in indexes], [self._targets[i] for i in indexes]
+
+
+    def update_targets(self, compute_targets, only_missing=False):
+        """
+        Recompute the cached target values of the stored samples with a single call of compute_targets(samples)
+        """
+        indexes = [i for i, target in enumerate(self._targets) if target is None or not only_missing]
+        if indexes:
+            targets = compute_targets([self._samples[i] for i in indexes])
+            for i, target in zip(indexes, targets):
+                self._targets[i] = target
+
+
+    def to_arrays(self):
+        """
+        Return the content of the memory as a dict of arrays, to be saved in a checkpoint
+        """
+        return {
+            'states': np.array([sample[0] for sample in self._samples]),
+            'actions': np.array([sample[1] for sample in self._samples], dtype=np.int64),
+            'rewards': np.array([sample[2] for sample in self._samples], dtype=np.float64),
+            'next_states': np.array([sample[3] for sample in self._samples]),
+            'targets': np.array([np.nan if target is None else target for target in self._targets], dtype=np.float32)
+        }
+
+
+    def load_arrays(self, arrays):
+        """
+        Replace the content of the memory with the arrays returned by to_arrays()
+        """
+        self._samples = list(zip(arrays['states'], arrays['actions'].tolist(), arrays['rewards'].tolist(), arrays['next_states']))
+        self._targets = [None if np.isnan(target) else target for target in arrays['targets']]
+
+
     def _size_now(self):
         """
         Check how full the memory is
         """
-        return len(self._samples)
\ No newline at end of file
+        return len(self._samples)
@@ -0,0 +1,139 @@
+import glob
+import os
+import struct
+import warnings
+import zipfile
+import numpy as np
+
+
+METRICS_FILE_NAME = 'metrics.npz'
+
+
+class MetricsFile:
+    def __init__(self, file_path):
+        self._file_path = file_path  # uncompressed npz, one 1-D array per column, so that every column can be memory-mapped
+        self._pending = {}  # column -> list of arrays to write at the next flush
+        self._replaced = set()  # columns whose stored values are dropped at the next flush
+
+
+    def write(self, name, values):
+        """
+        Replace the values of the column name, written at the next flush
+        """
+        self._pending[name] = [np.atleast_1d(np.asarray(values))]
+        self._replaced.add(name)
+
+
+    def append(self, name, values):
+        """
+        Append a value or a sequence of values to the column name, written at the next flush
+        """
+        self._pending.setdefault(name, []).append(np.atleast_1d(np.asarray(values)))
+
+
+    def flush(self):
+        """
+        Rewrite the file with the pending values, replacing it atomically. The whole file is read and written again,
+        so a flush costs time in proportion to all the stored values: flush after a batch of appends, not after each one
+        """
+        if not self._pending:
+            return
+        columns = {}
+        if os.path.isfile(self._file_path):
+            with np.load(self._file_path) as stored:
+                columns = {name: stored[name] for name in stored.files}
+        for name, chunks in self._pending.items():
+            if name in columns and name not in self._replaced:
+                chunks = [columns[name]] + chunks
+            columns[name] = np.concatenate(chunks)
+
+        tmp_file_path = self._file_path[:-len('.npz')] + '.tmp.npz'
+        np.savez(tmp_file_path, **columns)
+        os.replace(tmp_file_path, self._file_path)
+        self._pending = {}
+        self._replaced = set()
+
+
+    def load(self, name, mmap=True):
+        """
+        Return the stored values of the column name, memory-mapped read-only if mmap is set
+        """
+        if mmap:
+            array = memmap_npz_member(self._file_path, name)
+            if array is not None:
+                return array
+        with np.load(self._file_path) as stored:
+            return stored[name]
+
+
+    @property
+    def columns(self):
+        if not os.path.isfile(self._file_path):
+            return []
+        with zipfile.ZipFile(self._file_path) as archive:
+            return [member[:-len('.npy')] for member in archive.namelist()]
+
+
+    @property
+    def file_path(self):
+        return self._file_path
+
+
+def memmap_npz_member(file_path, name):
+    """
+    Memory-map the array name of an uncompressed npz, None if it is compressed or empty
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        info = archive.getinfo(name + '.npy')
+    if info.compress_type != zipfile.ZIP_STORED:
+        return None
+
+    with open(file_path, 'rb') as file:
+        file.seek(info.header_offset)
+        local_header = file.read(30)  # the extra field of the local header may differ from the one of the central directory
+        name_length, extra_length = struct.unpack('<HH', local_header[26:30])
+        file.seek(info.header_offset + 30 + name_length + extra_length)
+        version = np.lib.format.read_magic(file)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+        offset = file.tell()
+
+    if dtype.hasobject or int(np.prod(shape)) == 0:
+        return None
+    return np.memmap(file_path, dtype=dtype, mode='r', offset=offset, shape=shape, order='F' if fortran_order else 'C')
+
+
+def convert_text_metrics(folder_path, remove=False):
+    """
+    Store the series of the plot_*_data.txt and *.csv files of a folder as columns of its metrics file,
+    named after the files, and return the names of the columns written
+    """
+    Metrics = MetricsFile(os.path.join(folder_path, METRICS_FILE_NAME))
+    text_file_paths = sorted(glob.glob(os.path.join(folder_path, 'plot_*_data.txt')) + glob.glob(os.path.join(folder_path, '*.csv')))
+    names = []
+    converted_file_paths = []
+    for text_file_path in text_file_paths:
+        file_name = os.path.basename(text_file_path)
+        if file_name.startswith('plot_') and file_name.endswith('_data.txt'):
+            name = file_name[len('plot_'):-len('_data.txt')]
+        else:
+            name = os.path.splitext(file_name)[0]
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', UserWarning)  # an empty file is an empty series
+                values = np.loadtxt(text_file_path, dtype=np.float64, ndmin=1)
+        except ValueError:  # not a single column of numbers, e.g. the csv reports with a header
+            continue
+        if values.ndim > 1:
+            continue
+        Metrics.write(name, values)
+        names.append(name)
+        converted_file_paths.append(text_file_path)
+    Metrics.flush()
+
+    if remove:
+        for text_file_path in converted_file_paths:
+            os.remove(text_file_path)
+    return names
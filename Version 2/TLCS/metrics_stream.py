@@ -0,0 +1,65 @@
+import json
+import time
+
+
+STREAM_FILE_NAME = 'metrics.jsonl'
+
+
+class MetricsStream:
+    def __init__(self, file_path, buffer_size=1 << 16):
+        self._file = open(file_path, 'a', buffering=buffer_size)  # append only, written to disk when the buffer is full or flushed
+        self._episode = None
+
+
+    def write(self, kind, **fields):
+        """
+        Append a record of the given kind with its time, one json object per line
+        """
+        record = {'kind': kind, 'time': round(time.time(), 3)}
+        record.update(fields)
+        self._file.write(json.dumps(record) + '\n')
+
+
+    def start_episode(self, episode):
+        """
+        Set the episode of the decision records that follow
+        """
+        self._episode = episode
+
+
+    def flush(self):
+        self._file.flush()
+
+
+    def close(self):
+        self._file.close()
+
+
+    def reset(self):
+        """
+        Recorder interface of the simulations, nothing to clear between two episodes
+        """
+        pass
+
+
+    def add(self, step, state, action, greedy_action, queue_length, waiting_time):
+        """
+        Recorder interface of the simulations: append a record of the decision, greedy_action being -1 for an explorative one
+        """
+        self.write('decision', episode=self._episode, step=int(step), state=[int(value) for value in state], action=int(action),
+                   greedy_action=int(greedy_action), queue_length=int(queue_length), waiting_time=float(waiting_time))
+
+
+def read_stream(file_path, offset=0):
+    """
+    Return the records completely written after offset in a metrics stream, and the offset to read the next ones from
+    """
+    records = []
+    with open(file_path, 'rb') as file:
+        file.seek(offset)
+        for line in file:
+            if not line.endswith(b'\n'):  # still being written
+                break
+            records.append(json.loads(line))
+            offset += len(line)
+    return records, offset
@@ -2,6 +2,7 @@ import os
 os.environ['TF_CPP_MIN_LOG_LEVEL']='2'  # kill warning about tensorflow
 import tensorflow as tf
 import numpy as np
+import json
 import sys
 
 from tensorflow import keras
@@ -13,12 +14,16 @@ from tensorflow.keras.models import load_model
 
 
 class TrainModel:
-    def __init__(self, num_layers, width, batch_size, learning_rate, input_dim, output_dim):
+    def __init__(self, num_layers, width, batch_size, learning_rate, input_dim, output_dim, target_network=False):
         self._input_dim = input_dim
         self._output_dim = output_dim
         self._batch_size = batch_size
         self._learning_rate = learning_rate
         self._model = self._build_model(num_layers, width)
+        self._target_model = None
+        if target_network:  # frozen copy of the network used only to compute the Q(next_state) targets
+            self._target_model = self._build_model(num_layers, width)
+            self.sync_target()
 
 
     def _build_model(self, num_layers, width):
@@ -51,6 +56,22 @@ class TrainModel:
         return self._model.predict(states)
 
 
+    def predict_target_batch(self, states, batch_size=4096):
+        """
+        Predict the action values from a batch of states using the target network (the online one if there is none)
+        """
+        model = self._target_model if self._target_model is not None else self._model
+        return model.predict(states, batch_size=batch_size)
+
+
+    def sync_target(self):
+        """
+        Copy the weights of the online network into the target network
+        """
+        if self._target_model is not None:
+            self._target_model.set_weights(self._model.get_weights())
+
+
     def train_batch(self, states, q_sa):
         """
         Train the nn using the updated q-values
@@ -58,12 +79,52 @@ class TrainModel:
         self._model.fit(states, q_sa, epochs=1, verbose=0)
 
 
-    def save_model(self, path):
+    def set_random_seed(self, seed):
+        """
+        Seed the tensorflow random generators, so that the shuffling done while training is reproducible
+        """
+        tf.random.set_seed(seed)
+
+
+    def save_checkpoint(self, file_path):
+        """
+        Save the weights of the networks and the state of the optimizer in a npz file
+        """
+        arrays = {}
+        for i, weights in enumerate(self._model.get_weights()):
+            arrays['model_%d' % i] = weights
+        if self._target_model is not None:
+            for i, weights in enumerate(self._target_model.get_weights()):
+                arrays['target_%d' % i] = weights
+        for i, weights in enumerate(self._model.optimizer.get_weights()):
+            arrays['optimizer_%d' % i] = weights
+        np.savez(file_path, **arrays)
+
+
+    def load_checkpoint(self, file_path):
+        """
+        Restore the weights of the networks and the state of the optimizer saved by save_checkpoint()
+        """
+        with np.load(file_path) as checkpoint:
+            self._model.set_weights([checkpoint['model_%d' % i] for i in range(len(self._model.get_weights()))])
+            if self._target_model is not None:
+                self._target_model.set_weights([checkpoint['target_%d' % i] for i in range(len(self._target_model.get_weights()))])
+
+            # the optimizer creates its slots lazily, a step with zero gradients creates them without touching the weights
+            variables = self._model.trainable_variables
+            self._model.optimizer.apply_gradients(zip([tf.zeros_like(variable) for variable in variables], variables))
+            num_optimizer_weights = len([name for name in checkpoint.files if name.startswith('optimizer_')])
+            self._model.optimizer.set_weights([checkpoint['optimizer_%d' % i] for i in range(num_optimizer_weights)])
+
+
+    def save_model(self, path, save_h5=False):
         """
-        Save the current model in the folder as h5 file and a model architecture summary as png
+        Save the current model in the folder as npz weights with a json architecture manifest, optionally also as h5 file.
+        The architecture diagram is produced on demand by save_model_diagram()
         """
-        self._model.save(os.path.join(path, 'trained_model.h5'))
-        plot_model(self._model, to_file=os.path.join(path, 'model_structure.png'), show_shapes=True, show_layer_names=True)
+        save_weights(self._model, path)
+        if save_h5:
+            self._model.save(os.path.join(path, 'trained_model.h5'))
 
 
     @property
@@ -81,6 +142,11 @@ class TrainModel:
         return self._batch_size
 
 
+    @property
+    def has_target_network(self):
+        return self._target_model is not None
+
+
 class TestModel:
     def __init__(self, input_dim, model_path):
         self._input_dim = input_dim
@@ -93,8 +159,10 @@ class TestModel:
         """
         model_file_path = os.path.join(model_folder_path, 'trained_model.h5')
         
-        if os.path.isfile(model_file_path):
-            loaded_model = load_model(model_file_path)
+        if os.path.isfile(os.path.join(model_folder_path, 'model_manifest.json')):
+            return load_weights(model_folder_path)
+        elif os.path.isfile(model_file_path):
+            loaded_model = load_model(model_file_path, compile=False)  # only used for inference
             return loaded_model
         else:
             sys.exit("Model number not found")
@@ -108,6 +176,78 @@ class TestModel:
         return self._model.predict(state)
 
 
+    def predict_batch(self, states):
+        """
+        Predict the action values from a batch of states
+        """
+        return self._model.predict(states)
+
+
+    def export_weights(self, path):
+        """
+        Save the weights of the loaded model in the folder as npz with its json manifest, to be used by NumpyTestModel
+        """
+        save_weights(self._model, path)
+
+
     @property
     def input_dim(self):
-        return self._input_dim
\ No newline at end of file
+        return self._input_dim
+
+
+def save_weights(model, path):
+    """
+    Write the weights of the dense layers of a keras model in a npz file readable without tensorflow,
+    and its architecture in a small json manifest. Both files are replaced atomically, the folder is created if needed
+    """
+    os.makedirs(path, exist_ok=True)
+    arrays = {}
+    units = []
+    activations = []
+    dense_layers = [layer for layer in model.layers if isinstance(layer, layers.Dense)]
+    for i, layer in enumerate(dense_layers):
+        kernel, bias = layer.get_weights()
+        arrays['kernel_%d' % i] = kernel.astype(np.float32)
+        arrays['bias_%d' % i] = bias.astype(np.float32)
+        units.append(int(kernel.shape[1]))
+        activations.append(layer.get_config()['activation'])
+    manifest = {'input_dim': int(model.input_shape[1]), 'units': units, 'activations': activations}
+
+    _atomic_write(os.path.join(path, 'trained_model.npz'), lambda file: np.savez(file, num_layers=len(dense_layers), activations=np.array(activations), **arrays))
+    _atomic_write(os.path.join(path, 'model_manifest.json'), lambda file: file.write(json.dumps(manifest, indent=4).encode()))
+
+
+def load_weights(model_folder_path):
+    """
+    Rebuild the network described by the json manifest of the folder and load its npz weights, without compiling it
+    """
+    with open(os.path.join(model_folder_path, 'model_manifest.json')) as file:
+        manifest = json.load(file)
+
+    inputs = keras.Input(shape=(manifest['input_dim'],))
+    x = inputs
+    for width, activation in zip(manifest['units'], manifest['activations']):
+        x = layers.Dense(width, activation=activation)(x)
+    model = keras.Model(inputs=inputs, outputs=x, name='my_model')
+
+    with np.load(os.path.join(model_folder_path, 'trained_model.npz')) as weights:
+        model.set_weights([weights[name % i] for i in range(len(manifest['units'])) for name in ('kernel_%d', 'bias_%d')])
+    return model
+
+
+def save_model_diagram(model_folder_path):
+    """
+    Save a model architecture summary as png in the folder of a saved model (needs pydot and graphviz)
+    """
+    model = load_weights(model_folder_path)
+    plot_model(model, to_file=os.path.join(model_folder_path, 'model_structure.png'), show_shapes=True, show_layer_names=True)
+
+
+def _atomic_write(file_path, write):
+    """
+    Call write(file) on a temporary file, then move it over file_path so readers never see a partial file
+    """
+    tmp_file_path = file_path + '.tmp'
+    with open(tmp_file_path, 'wb') as file:
+        write(file)
+    os.replace(tmp_file_path, file_path)
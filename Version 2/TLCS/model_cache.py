@@ -0,0 +1,61 @@
+from collections import OrderedDict
+import numpy as np
+
+
+class CachedModel:
+    def __init__(self, Model, cache_size):
+        self._Model = Model
+        self._cache_size = cache_size
+        self._cache = OrderedDict()  # integer state bytes -> action values, least recently used first
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+
+    def predict_one(self, state):
+        """
+        Predict the action values from a single state, reusing the last values computed for the same vehicle counts
+        """
+        key = np.asarray(state, dtype=np.int32).tobytes()
+        q_values = self._cache.get(key)
+        if q_values is not None:
+            self._hits += 1
+            self._cache.move_to_end(key)
+            return q_values
+
+        self._misses += 1
+        q_values = self._Model.predict_one(state)
+        self._cache[key] = q_values
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)  # drop the least recently used state
+            self._evictions += 1
+        return q_values
+
+
+    def stats(self):
+        """
+        Return a printable summary of the cache usage
+        """
+        lookups = self._hits + self._misses
+        hit_rate = 100 * self._hits / lookups if lookups else 0
+        return 'hits: %d - misses: %d - evictions: %d - hit rate: %.1f%%' % (self._hits, self._misses, self._evictions, hit_rate)
+
+
+    @property
+    def input_dim(self):
+        return self._Model.input_dim
+
+
+    @property
+    def hits(self):
+        return self._hits
+
+
+    @property
+    def misses(self):
+        return self._misses
+
+
+    @property
+    def evictions(self):
+        return self._evictions
@@ -0,0 +1,129 @@
+import functools
+import math
+import os
+import sys
+import xml.etree.ElementTree as ET
+import numpy as np
+
+
+DEFAULT_SUMO_CONFIG = os.path.join('intersection', 'sumo_config.sumocfg.xml')
+
+LEFT_DIRECTIONS = ('l', 'L', 't')  # left, partially left and turnaround movements of the connections
+
+
+class Network:
+    def __init__(self, net_file, tl_id=None):
+        """
+        Read the approaches, lanes and phases of a traffic light from the net file, the only one of the network by default
+        """
+        root = ET.parse(net_file).getroot()
+        tl_logics = {tl.get('id'): tl for tl in root.iter('tlLogic')}
+        if tl_id is None:
+            if len(tl_logics) != 1:
+                sys.exit('The network ' + net_file + ' has ' + str(len(tl_logics)) + ' traffic lights, choose one of them')
+            tl_id = next(iter(tl_logics))
+        self._tl_id = tl_id
+
+        junctions = {junction.get('id'): (float(junction.get('x')), float(junction.get('y'))) for junction in root.iter('junction')}
+        edge_origins = {edge.get('id'): edge.get('from') for edge in root.iter('edge') if edge.get('function') != 'internal'}
+
+        # movements of every incoming lane controlled by the traffic light
+        lane_directions = {}
+        tl_junction = None
+        for connection in root.iter('connection'):
+            if connection.get('tl') != tl_id or connection.get('from').startswith(':'):
+                continue
+            lane_directions.setdefault((connection.get('from'), int(connection.get('fromLane'))), []).append(connection.get('dir'))
+        incoming_edges = sorted(set(edge_id for edge_id, lane_index in lane_directions))
+        for edge in root.iter('edge'):
+            if edge.get('id') in incoming_edges:
+                tl_junction = edge.get('to')
+
+        # approaches in clockwise order starting from the west, i.e. W, N, E, S on a four-way intersection
+        def clockwise_from_west(edge_id):
+            x, y = junctions[edge_origins[edge_id]]
+            x_tl, y_tl = junctions[tl_junction]
+            return (180 - math.degrees(math.atan2(y - y_tl, x - x_tl))) % 360
+        self._incoming_edges = sorted(incoming_edges, key=clockwise_from_west)
+
+        # two lane groups per approach: the lanes with a straight or right movement, then the left turn only lanes
+        self._lane_groups = []
+        for edge_id in self._incoming_edges:
+            lane_indexes = sorted(lane_index for lane_edge_id, lane_index in lane_directions if lane_edge_id == edge_id)
+            left_only = [index for index in lane_indexes if all(direction in LEFT_DIRECTIONS for direction in lane_directions[edge_id, index])]
+            self._lane_groups.append([edge_id + '_' + str(index) for index in lane_indexes if index not in left_only])
+            self._lane_groups.append([edge_id + '_' + str(index) for index in left_only])
+        self._state_lanes = [lane_id for group in self._lane_groups for lane_id in group]
+        self._state_groups = np.array([i for i, group in enumerate(self._lane_groups) for lane_id in group], dtype=np.int64)
+
+        # one action per green phase, in the order of the program; the yellow phase is the one following it
+        states = [phase.get('state') for phase in tl_logics[tl_id].iter('phase')]
+        self._green_phases = [i for i, state in enumerate(states) if 'y' not in state and ('G' in state or 'g' in state)]
+        self._yellow_phases = []
+        for i in self._green_phases:
+            following = (i + 1) % len(states)
+            self._yellow_phases.append(following if 'y' in states[following] else i)  # without yellow phase, the green is held
+
+
+    def check(self, num_states, num_actions):
+        """
+        Exit if the network does not match the numbers of states and actions of the agent
+        """
+        if len(self._lane_groups) != num_states:
+            sys.exit('The network has %d lane groups (two per approach) but num_states is %d' % (len(self._lane_groups), num_states))
+        if len(self._green_phases) < num_actions:
+            sys.exit('The network has %d green phases but num_actions is %d' % (len(self._green_phases), num_actions))
+
+
+    def state(self, lane_counts):
+        """
+        Sum the vehicle counts of the state lanes by lane group
+        """
+        return np.bincount(self._state_groups, weights=lane_counts, minlength=len(self._lane_groups))
+
+
+    @property
+    def tl_id(self):
+        return self._tl_id
+
+
+    @property
+    def incoming_edges(self):
+        return self._incoming_edges
+
+
+    @property
+    def lane_groups(self):
+        return self._lane_groups
+
+
+    @property
+    def state_lanes(self):
+        return self._state_lanes
+
+
+    @property
+    def green_phases(self):
+        return self._green_phases
+
+
+    @property
+    def yellow_phases(self):
+        return self._yellow_phases
+
+
+def network_of(sumo_cmd):
+    """
+    Return the network of the SUMO configuration of the command (the default one if there is no command), parsed once per process
+    """
+    config_file = DEFAULT_SUMO_CONFIG
+    if sumo_cmd is not None and '-c' in sumo_cmd:
+        config_file = sumo_cmd[sumo_cmd.index('-c') + 1]
+    root = ET.parse(config_file).getroot()
+    net_file = root.find('input/net-file').get('value')
+    return load_network(os.path.abspath(os.path.join(os.path.dirname(config_file), net_file)))
+
+
+@functools.lru_cache(maxsize=None)
+def load_network(net_file):
+    return Network(net_file)
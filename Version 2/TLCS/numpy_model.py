@@ -0,0 +1,98 @@
+import numpy as np
+import os
+import sys
+
+
+ACTIVATIONS = ('relu', 'linear')  # the only activations of the forward pass below
+
+
+class NumpyTestModel:
+    def __init__(self, input_dim, model_path):
+        self._input_dim = input_dim
+        self._kernels, self._biases, self._activations = self._load_my_model(model_path)
+
+        # preallocated buffers for the single state forward pass
+        self._input = np.zeros((1, self._input_dim), dtype=np.float32)
+        self._buffers = [np.zeros((1, kernel.shape[1]), dtype=np.float32) for kernel in self._kernels]
+
+
+    def _load_my_model(self, model_folder_path):
+        """
+        Load the weights exported as npz in the folder specified by the model number, if they exist
+        """
+        model_file_path = os.path.join(model_folder_path, 'trained_model.npz')
+
+        if os.path.isfile(model_file_path):
+            with np.load(model_file_path) as weights:
+                num_layers = int(weights['num_layers'])
+                kernels = [self._dequantize(weights, i) for i in range(num_layers)]
+                biases = [weights['bias_%d' % i].astype(np.float32) for i in range(num_layers)]
+                activations = [str(activation) for activation in weights['activations']]
+            unsupported = sorted(set(activations) - set(ACTIVATIONS))
+            if unsupported:
+                sys.exit("Unsupported activation %s in %s, the numpy backend only runs relu and linear layers" % (', '.join(unsupported), model_file_path))
+            return kernels, biases, activations
+        else:
+            sys.exit("Model weights not found, export them with export_model.py")
+
+
+    def _dequantize(self, weights, i):
+        """
+        Return the kernel of layer i as float32, rescaling it if it was stored quantized to int8
+        """
+        kernel = weights['kernel_%d' % i].astype(np.float32)
+        if 'kernel_scale_%d' % i in weights:
+            kernel *= weights['kernel_scale_%d' % i]
+        return kernel
+
+
+    def predict_one(self, state):
+        """
+        Predict the action values from a single state
+        """
+        self._input[0] = state
+        x = self._input
+        for kernel, bias, activation, out in zip(self._kernels, self._biases, self._activations, self._buffers):
+            np.matmul(x, kernel, out=out)
+            np.add(out, bias, out=out)
+            if activation == 'relu':
+                np.maximum(out, 0, out=out)
+            x = out
+        return x.copy()
+
+
+    def predict_batch(self, states):
+        """
+        Predict the action values from a batch of states
+        """
+        x = np.asarray(states, dtype=np.float32)
+        for kernel, bias, activation in zip(self._kernels, self._biases, self._activations):
+            x = np.matmul(x, kernel) + bias
+            if activation == 'relu':
+                np.maximum(x, 0, out=x)
+        return x
+
+
+    @property
+    def input_dim(self):
+        return self._input_dim
+
+
+    @property
+    def num_parameters(self):
+        return sum(kernel.size + bias.size for kernel, bias in zip(self._kernels, self._biases))
+
+
+def quantize_weights(src_file_path, dst_file_path):
+    """
+    Copy an exported npz model storing every kernel as int8 with a symmetric per-column scale
+    """
+    with np.load(src_file_path) as weights:
+        arrays = {name: weights[name] for name in weights.files}
+    for i in range(int(arrays['num_layers'])):
+        kernel = arrays['kernel_%d' % i].astype(np.float32)
+        scale = np.abs(kernel).max(axis=0) / 127.0
+        scale[scale == 0] = 1.0  # all-zero columns
+        arrays['kernel_%d' % i] = np.clip(np.rint(kernel / scale), -127, 127).astype(np.int8)
+        arrays['kernel_scale_%d' % i] = scale.astype(np.float32)
+    np.savez(dst_file_path, **arrays)
@@ -0,0 +1,54 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import datetime
+import timeit
+from shutil import copyfile
+
+from dataset import Dataset, train_offline
+from visualization import Visualization
+from catalog import open_catalog
+from utils import import_offline_train_configuration, set_train_path
+
+
+if __name__ == "__main__":
+
+    config = import_offline_train_configuration(config_file='offline_training_settings.ini')
+    Data = Dataset(config['dataset_paths'])
+    path = set_train_path(config['models_path_name'])
+    Catalog = open_catalog(path)
+    Catalog.start_run(path, 'offline_training', config)
+
+    from model import TrainModel  # tensorflow is imported only once the configuration is read
+    Model = TrainModel(
+        config['num_layers'],
+        config['width_layers'],
+        config['batch_size'],
+        config['learning_rate'],
+        input_dim=config['num_states'],
+        output_dim=config['num_actions'],
+        target_network=config['target_network']
+    )
+
+    Visualization = Visualization(
+        path,
+        dpi=96,
+        background=config['background_plots']
+    )
+
+    print('\n----- Training offline on', Data.num_transitions, 'transitions from', Data.num_shards, 'episodes')
+    timestamp_start = datetime.datetime.now()
+    start_time = timeit.default_timer()
+    td_errors = train_offline(Model, Data, config['gamma'], config['training_epochs'], config['prefetch_depth'])
+    print('Training time:', round(timeit.default_timer() - start_time, 1), 's')
+
+    print("\n----- Start time:", timestamp_start)
+    print("----- End time:", datetime.datetime.now())
+    print("----- Session info saved at:", path)
+
+    Model.save_model(path)
+    Catalog.end_run(path, metrics={'td_error': td_errors[-1] if td_errors else None})
+    copyfile(src='offline_training_settings.ini', dst=os.path.join(path, 'offline_training_settings.ini'))
+
+    Visualization.save_data_and_plot(data=td_errors, filename='td_error', xlabel='Epoch', ylabel='Mean absolute TD error')
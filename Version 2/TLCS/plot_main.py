@@ -0,0 +1,50 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import glob
+import argparse
+import datetime
+import traceback
+import multiprocessing
+
+from plotting import render_plot, read_plots, PLOTS_FILE_NAME, MAX_POINTS
+
+
+def render_logged(folder_path, filename, max_points=MAX_POINTS):
+    """
+    Render a plot and return None, or the error it raised after appending its traceback to plots.log of the folder
+    """
+    try:
+        render_plot(folder_path, filename, max_points)
+    except Exception as error:
+        with open(os.path.join(folder_path, 'plots.log'), 'a') as file:
+            file.write('%s plot %s failed\n%s\n' % (datetime.datetime.now(), filename, traceback.format_exc()))
+        return repr(error)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Render the plots of run folders from their metrics file')
+    parser.add_argument('folders', nargs='*', help='run folders, by default every model folder and test folder with a ' + PLOTS_FILE_NAME)
+    parser.add_argument('--plots', nargs='*', help='names of the plots to render, by default all of them')
+    parser.add_argument('--max-points', type=int, default=MAX_POINTS, help='points drawn per series at most, longer series are downsampled')
+    parser.add_argument('--workers', type=int, default=1, help='number of plots rendered in parallel')
+    args = parser.parse_args()
+    if args.max_points < 2:
+        parser.error('--max-points must be at least 2, the minimum and the maximum of a bucket')
+
+    folders = args.folders or sorted(os.path.dirname(file_path) for file_path in
+                                     glob.glob(os.path.join('models', '*', PLOTS_FILE_NAME)) + glob.glob(os.path.join('models', '*', 'test', PLOTS_FILE_NAME)))
+    jobs = [(folder, filename, args.max_points) for folder in folders for filename in read_plots(folder) if not args.plots or filename in args.plots]
+
+    if args.workers > 1 and len(jobs) > 1:
+        with multiprocessing.get_context('spawn').Pool(args.workers) as pool:
+            errors = pool.starmap(render_logged, jobs)
+    else:
+        errors = [render_logged(*job) for job in jobs]
+
+    for (folder, filename, max_points), error in zip(jobs, errors):
+        if error is not None:
+            print('Plot', filename, 'of', folder, 'failed:', error)
+    print('Rendered', errors.count(None), 'of', len(jobs), 'plots')
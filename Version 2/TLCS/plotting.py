@@ -0,0 +1,95 @@
+import json
+import os
+import numpy as np
+
+from metrics import MetricsFile, METRICS_FILE_NAME
+
+
+PLOTS_FILE_NAME = 'plots.json'  # what to plot from the metrics file of a folder: filename -> columns and labels
+COLORS = [None, 'red', 'black']  # first series in the default color, as before
+MAX_POINTS = 4000  # points drawn per series, about two per pixel of a 20 inches wide plot at 96 dpi
+
+
+def add_plot(folder_path, filename, columns, xlabel, ylabel, dpi):
+    """
+    Record in the plots file of a folder how to plot the columns of its metrics file, replacing it atomically
+    """
+    file_path = os.path.join(folder_path, PLOTS_FILE_NAME)
+    plots = read_plots(folder_path)
+    plots[filename] = {'columns': columns, 'xlabel': xlabel, 'ylabel': ylabel, 'dpi': dpi}
+    with open(file_path + '.tmp', 'w') as file:
+        json.dump(plots, file, indent=4)
+    os.replace(file_path + '.tmp', file_path)
+
+
+def read_plots(folder_path):
+    """
+    Return the plots recorded in the plots file of a folder, empty if there is none
+    """
+    file_path = os.path.join(folder_path, PLOTS_FILE_NAME)
+    if not os.path.isfile(file_path):
+        return {}
+    with open(file_path) as file:
+        return json.load(file)
+
+
+def render_plot(folder_path, filename, max_points=MAX_POINTS):
+    """
+    Render the plot filename of a folder from its metrics file to plot_<filename>.png, every series downsampled to max_points.
+    Only the object-oriented API on an Agg canvas is used, no pyplot global state, so plots can be rendered concurrently
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    plot = read_plots(folder_path)[filename]
+    Metrics = MetricsFile(os.path.join(folder_path, METRICS_FILE_NAME))
+    series = []
+    for column in plot['columns']:
+        data = Metrics.load(column)  # memory-mapped, only the points kept are copied
+        series.append(downsample_minmax(data, max_points))
+        del data  # no file mapping left open while the session rewrites the file
+
+    fig = Figure(figsize=(20, 11.25))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    for (indexes, values), color in zip(series, COLORS + [None] * len(series)):
+        ax.plot(indexes, values, color=color)
+    ax.set_ylabel(plot['ylabel'], fontsize=24)
+    ax.set_xlabel(plot['xlabel'], fontsize=24)
+    ax.tick_params(labelsize=24)
+    ax.margins(0)
+    if all(len(values) > 0 for indexes, values in series):
+        min_val = min(float(values.min()) for indexes, values in series)  # the extremes are kept by the downsampling
+        max_val = max(float(values.max()) for indexes, values in series)
+        ax.set_ylim(min_val - 0.05 * abs(min_val), max_val + 0.05 * abs(max_val))
+    fig.savefig(os.path.join(folder_path, 'plot_'+filename+'.png'), dpi=plot['dpi'])
+
+
+def downsample_minmax(data, max_points):
+    """
+    Return the indexes and values of at most max_points points of the series: the minimum and the maximum of every bucket
+    of consecutive values, in their order, so that the extremes and the envelope of the series are drawn as with every point.
+    At least one bucket is kept, i.e. two points
+    """
+    max_points = max(max_points, 2)
+    num_values = len(data)
+    if num_values <= max_points:
+        return np.arange(num_values), np.array(data)
+
+    bucket_size = -(-num_values // (max_points // 2))  # rounded up, at most max_points // 2 buckets
+    num_buckets = -(-num_values // bucket_size)
+    indexes = np.empty((num_buckets, 2), dtype=np.int64)
+    for start in range(0, num_values, bucket_size * 1024):  # by chunks of buckets, to bound the memory on very long series
+        chunk = np.asarray(data[start:start + bucket_size * 1024])
+        full = len(chunk) // bucket_size
+        buckets = chunk[:full * bucket_size].reshape(full, bucket_size)
+        first_bucket = start // bucket_size
+        indexes[first_bucket:first_bucket + full, 0] = buckets.argmin(axis=1)
+        indexes[first_bucket:first_bucket + full, 1] = buckets.argmax(axis=1)
+        indexes[first_bucket:first_bucket + full] += (first_bucket + np.arange(full))[:, None] * bucket_size
+        if full * bucket_size < len(chunk):  # last bucket, shorter
+            rest = chunk[full * bucket_size:]
+            indexes[first_bucket + full] = [start + full * bucket_size + rest.argmin(), start + full * bucket_size + rest.argmax()]
+    indexes.sort(axis=1)  # minimum and maximum of a bucket in the order they occur
+    indexes = indexes.ravel()
+    return indexes, np.asarray(data[indexes])
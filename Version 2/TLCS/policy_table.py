@@ -0,0 +1,191 @@
+import numpy as np
+import os
+import sys
+
+
+NO_ACTION = 255  # cell of a dense level left to the next level or to the network
+
+
+def greedy_actions(q_values):
+    """
+    Index of the best action of every row, ties going to the last action as in TestModel
+    """
+    q_values = np.asarray(q_values)
+    return q_values.shape[1] - 1 - np.argmax(q_values[:, ::-1], axis=1)
+
+
+class PolicyTable:
+    def __init__(self, levels):
+        self._levels = []  # (bin edges, {cell key: action} or dense actions array) from the finest to the coarsest quantization
+        self._arrays = levels
+        for bin_edges, keys, actions in levels:
+            if keys is None:  # enumerated grid, the actions array is indexed by the cell key
+                table = actions
+            else:
+                table = dict(zip(keys.tolist(), actions.tolist()))
+            self._levels.append((np.asarray(bin_edges, dtype=np.float32), table))
+
+
+    @classmethod
+    def build(cls, Model, states, levels_bin_edges, max_cells, min_agreement=0.9, batch_size=10000):
+        """
+        For every quantization level, store the greedy action of the network in the grid cells reached by the states,
+        if it is also the greedy action of at least min_agreement of the states of the cell. The other cells are left
+        to the next level or to the network. A level of at most max_cells cells is stored as a dense array
+        """
+        num_states = states.shape[1]
+        greedy = greedy_actions(np.concatenate([Model.predict_batch(states[start:start + batch_size]) for start in range(0, len(states), batch_size)]))
+        levels = []
+        for bin_edges in levels_bin_edges:
+            bin_edges = np.asarray(bin_edges, dtype=np.float32)
+            num_bins = len(bin_edges)
+
+            state_cells = np.maximum(np.digitize(states, bin_edges) - 1, 0)
+            keys, first, inverse = np.unique(np.ravel_multi_index(state_cells.T, (num_bins,) * num_states), return_index=True, return_inverse=True)
+            cells = state_cells[first]
+
+            # representative state of every cell: the middle of its bin, the lower edge for the last open bin
+            upper_edges = np.append(bin_edges[1:], bin_edges[-1] + 1)
+            centers = np.floor((bin_edges + upper_edges - 1) / 2)
+            representatives = centers[cells]
+
+            actions = greedy_actions(np.concatenate([Model.predict_batch(representatives[start:start + batch_size]) for start in range(0, len(cells), batch_size)]))
+            inverse = inverse.reshape(-1)
+            agreement = np.bincount(inverse, weights=greedy == actions[inverse]) / np.bincount(inverse)
+            kept = agreement >= min_agreement
+
+            if num_bins ** num_states <= max_cells:
+                dense_actions = np.full(num_bins ** num_states, NO_ACTION, dtype=np.uint8)
+                dense_actions[keys[kept]] = actions[kept]
+                levels.append((bin_edges, None, dense_actions))
+            else:
+                levels.append((bin_edges, keys[kept].astype(np.int64), actions[kept].astype(np.uint8)))
+        return cls(levels)
+
+
+    @classmethod
+    def load(cls, file_path):
+        """
+        Load a table saved with save()
+        """
+        with np.load(file_path) as table:
+            return cls([(table['bin_edges_%d' % i], table['keys_%d' % i] if 'keys_%d' % i in table else None, table['actions_%d' % i]) for i in range(int(table['num_levels']))])
+
+
+    def save(self, file_path):
+        """
+        Save the table as npz
+        """
+        arrays = {}
+        for i, (bin_edges, keys, actions) in enumerate(self._arrays):
+            arrays['bin_edges_%d' % i] = bin_edges
+            if keys is not None:
+                arrays['keys_%d' % i] = keys
+            arrays['actions_%d' % i] = actions
+        np.savez(file_path, num_levels=len(self._arrays), **arrays)
+
+
+    def lookup(self, state):
+        """
+        Return the level and the stored action for the state, or (None, None) if its cells are not in the table
+        """
+        for level, (bin_edges, table) in enumerate(self._levels):
+            key = 0
+            for value in np.searchsorted(bin_edges, state, side='right') - 1:
+                key = key * len(bin_edges) + max(int(value), 0)
+            if isinstance(table, dict):
+                action = table.get(key)
+                if action is not None:
+                    return level, action
+            elif table[key] != NO_ACTION:
+                return level, int(table[key])
+        return None, None
+
+
+    def coverage(self, Model, states):
+        """
+        Fraction of the states found at every level of the table and, among those, fraction where the table agrees with the network
+        """
+        found = np.zeros(len(self._levels))
+        agree = np.zeros(len(self._levels))
+        for state, greedy in zip(states, greedy_actions(Model.predict_batch(states))):
+            level, action = self.lookup(state)
+            if level is not None:
+                found[level] += 1
+                agree[level] += action == greedy
+        return found / len(states), np.divide(agree, found, out=np.zeros_like(agree), where=found > 0)
+
+
+    @property
+    def num_cells(self):
+        return [len(table) if isinstance(table, dict) else int(np.count_nonzero(table != NO_ACTION)) for _, table in self._levels]
+
+
+class StateRecorder:
+    def __init__(self, Model):
+        self._Model = Model
+        self._states = []
+
+
+    def predict_one(self, state):
+        """
+        Predict with the wrapped model, keeping track of the state
+        """
+        self._states.append(np.array(state))
+        return self._Model.predict_one(state)
+
+
+    @property
+    def states(self):
+        return np.array(self._states)
+
+
+class TableTestModel:
+    def __init__(self, input_dim, num_actions, model_path, Fallback):
+        self._input_dim = input_dim
+        self._num_actions = num_actions
+        self._Table = self._load_my_table(model_path)
+        self._Fallback = Fallback  # network used for the states outside the table
+        self._hits = 0
+        self._misses = 0
+
+
+    def _load_my_table(self, model_folder_path):
+        """
+        Load the policy table stored in the folder specified by the model number, if it exists
+        """
+        table_file_path = os.path.join(model_folder_path, 'policy_table.npz')
+
+        if os.path.isfile(table_file_path):
+            return PolicyTable.load(table_file_path)
+        else:
+            sys.exit("Policy table not found, build it with policy_table_main.py")
+
+
+    def predict_one(self, state):
+        """
+        Return one-hot action scores from the table, or the action values of the fallback network outside of it
+        """
+        _, action = self._Table.lookup(state)
+        if action is None:
+            self._misses += 1
+            return self._Fallback.predict_one(state)
+        self._hits += 1
+        scores = np.zeros((1, self._num_actions), dtype=np.float32)
+        scores[0, action] = 1
+        return scores
+
+
+    @property
+    def input_dim(self):
+        return self._input_dim
+
+
+    @property
+    def hits(self):
+        return self._hits
+
+
+    @property
+    def misses(self):
+        return self._misses
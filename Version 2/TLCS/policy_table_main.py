@@ -0,0 +1,68 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import numpy as np
+
+from testing_simulation import Simulation
+from generator import TrafficGenerator
+from numpy_model import NumpyTestModel
+from policy_table import PolicyTable, StateRecorder
+from utils import import_test_configuration, set_sumo, set_traci, set_test_path
+
+
+if __name__ == "__main__":
+
+    config = import_test_configuration(config_file='testing_settings.ini')
+    sumo_cmd = set_sumo(config['gui'], config['sumocfg_file_name'], config['max_steps'], config['traci_backend'])
+    model_path, _ = set_test_path(config['models_path_name'], config['model_to_test'])
+
+    Model = NumpyTestModel(
+        input_dim=config['num_states'],
+        model_path=model_path
+    )
+
+    TrafficGen = TrafficGenerator(
+        config['max_steps'],
+        config['n_cars_generated']
+    )
+
+    def collect_states(seeds):
+        """
+        Run the network on the given seeds and return every state on which it had to decide
+        """
+        Recorder = StateRecorder(Model)
+        for seed in seeds:
+            print('\n----- Collecting states, seed', seed)
+            Sim = Simulation(
+                Recorder,
+                TrafficGen,
+                sumo_cmd,
+                config['max_steps'],
+                config['green_duration'],
+                config['yellow_duration'],
+                config['num_states'],
+                config['num_actions'],
+                Traci=set_traci(config['traci_backend'], config['trace_file'])
+            )
+            Sim.run(seed)
+        return Recorder.states
+
+    states = collect_states(config['table_seeds'])
+    Table = PolicyTable.build(Model, states, config['table_bin_edges'], config['table_max_cells'], config['table_min_agreement'])
+    Table.save(os.path.join(model_path, 'policy_table.npz'))
+
+    # coverage on the testing scenario, which was not used to build the table
+    found, agreement = Table.coverage(Model, collect_states([config['episode_seed']]))
+
+    with open(os.path.join(model_path, 'policy_table_report.txt'), "w") as report:
+        print('built from seeds:', config['table_seeds'], '-', len(states), 'states', file=report)
+        print('table size:', os.path.getsize(os.path.join(model_path, 'policy_table.npz')), 'bytes', file=report)
+        print('coverage on seed', config['episode_seed'], file=report)
+        for level, (bin_edges, cells, level_found, level_agreement) in enumerate(zip(config['table_bin_edges'], Table.num_cells, found, agreement)):
+            print('  level %d: %d bins, %d cells, %.1f%% of states, %.1f%% agreement with the network' % (level, len(bin_edges), cells, 100 * level_found, 100 * level_agreement), file=report)
+        print('  network fallback: %.1f%% of states' % (100 * (1 - np.sum(found))), file=report)
+
+    with open(os.path.join(model_path, 'policy_table_report.txt')) as report:
+        print('\n' + report.read())
+    print("----- Policy table saved at:", model_path)
@@ -0,0 +1,94 @@
+import json
+import os
+import timeit
+
+
+class Profiler:
+    def __init__(self):
+        self._total_times = {}
+        self._num_calls = {}
+
+
+    def section(self, name):
+        """
+        Return a context manager timing the code run inside it under the given name
+        """
+        return _Section(self, name)
+
+
+    def add(self, name, elapsed):
+        """
+        Account one call of the section name that lasted elapsed seconds
+        """
+        self._total_times[name] = self._total_times.get(name, 0.0) + elapsed
+        self._num_calls[name] = self._num_calls.get(name, 0) + 1
+
+
+    def reset(self):
+        """
+        Forget the timings collected so far, at the beginning of every episode
+        """
+        self._total_times = {}
+        self._num_calls = {}
+
+
+    def summary(self):
+        """
+        Return the calls count, total and mean time of every section, the slowest first
+        """
+        summary = {}
+        for name in sorted(self._total_times, key=self._total_times.get, reverse=True):
+            summary[name] = {
+                'calls': self._num_calls[name],
+                'total_s': round(self._total_times[name], 6),
+                'mean_us': round(1e6 * self._total_times[name] / self._num_calls[name], 1)
+            }
+        return summary
+
+
+    def save(self, file_path):
+        """
+        Write the summary of the timings as json
+        """
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w') as file:
+            json.dump(self.summary(), file, indent=4)
+
+
+class NullProfiler:  # used when profiling is disabled
+    def section(self, name):
+        return _NULL_SECTION
+
+
+    def add(self, name, elapsed):
+        pass
+
+
+    def reset(self):
+        pass
+
+
+class _Section:
+    def __init__(self, Profiler, name):
+        self._Profiler = Profiler
+        self._name = name
+
+
+    def __enter__(self):
+        self._start = timeit.default_timer()
+
+
+    def __exit__(self, *exc_info):
+        self._Profiler.add(self._name, timeit.default_timer() - self._start)
+
+
+class _NullSection:
+    def __enter__(self):
+        pass
+
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_SECTION = _NullSection()
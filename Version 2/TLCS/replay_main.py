@@ -0,0 +1,53 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import argparse
+import numpy as np
+
+from decisions import load_decisions, replay_decisions
+from utils import import_test_configuration, set_test_path
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Replay the decisions recorded by testing_main.py against other models, without SUMO')
+    parser.add_argument('decisions', nargs='+', help='decisions.npz files written with record_decisions = True')
+    parser.add_argument('--models', nargs='+', type=int, help='numbers of the models to replay (default: model_to_test of the settings)')
+    parser.add_argument('--backend', choices=['numpy', 'keras'], default='numpy', help='inference backend of the replayed models')
+    parser.add_argument('--output', default='replay_report.txt', help='text file where the comparison is written')
+    args = parser.parse_args()
+
+    config = import_test_configuration(config_file='testing_settings.ini')
+    if args.backend == 'numpy':
+        from numpy_model import NumpyTestModel as TestModel
+    else:
+        from model import TestModel
+
+    traces = [(file_path, load_decisions(file_path)) for file_path in args.decisions]
+
+    lines = []
+    for model_n in args.models or [config['model_to_test']]:
+        model_path, _ = set_test_path(config['models_path_name'], model_n)
+        Model = TestModel(
+            input_dim=config['num_states'],
+            model_path=model_path
+        )
+        for file_path, decisions in traces:
+            result = replay_decisions(Model, decisions, config['num_actions'])
+            metadata = ' '.join('%s=%s' % item for item in sorted(decisions['metadata'].items()))
+            lines.append('model %d on %s (%s)' % (model_n, file_path, metadata))
+            lines.append('  decisions: %d' % result['decisions'])
+            lines.append('  greedy action agreement: %.2f%%' % (100 * result['agreement']))
+            lines.append('  agreement with the applied actions: %.2f%%' % (100 * result['applied_agreement']))
+            lines.append('  queue weighted agreement: %.2f%%' % (100 * result['queue_weighted_agreement']))
+            lines.append('  first divergence at step: %s' % result['first_divergence_step'])
+            lines.append('  recorded greedy action (rows) x new action (columns):')
+            lines += ['    ' + ' '.join('%5d' % count for count in row) for row in result['confusion']]
+            lines.append('  new action counts: ' + ' '.join(str(count) for count in np.bincount(result['new_actions'], minlength=config['num_actions'])))
+            lines.append('')
+
+    report = '\n'.join(lines)
+    print(report)
+    with open(args.output, 'w') as file:
+        file.write(report)
+    print("----- Replay report saved at:", args.output)
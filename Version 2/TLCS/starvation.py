@@ -0,0 +1,74 @@
+import numpy as np
+
+
+# traversal codes
+NS = 0
+SN = 1
+EW = 2
+WE = 3
+SL = 4
+NL = 5
+WL = 6
+EL = 7
+
+NUM_TRAVERSALS = 8
+
+# traversals served by the green phase of every action (ref on environment.net.xml)
+SERVED_TRAVERSALS = [
+    [NS, SN],  # action 0: north-south
+    [NL, SL],  # action 1: north-south left
+    [EW, WE],  # action 2: east-west
+    [WL, EL],  # action 3: east-west left
+    [WE, WL],  # action 4: west
+    [EW, EL],  # action 5: east
+    [NS, NL],  # action 6: north
+    [SN, SL]   # action 7: south
+]
+
+# action giving the green to a starving traversal, the one approach serving both its straight and left movements
+FORCED_ACTIONS = {NS: 6, NL: 6, SN: 7, SL: 7, EW: 5, EL: 5, WE: 4, WL: 4}
+
+
+class StarvationGuard:
+    def __init__(self, threshold, num_actions=8):
+        self._threshold = threshold  # decisions a traversal can wait before being forced, 0 to disable
+        self._waiting = np.ones((num_actions, NUM_TRAVERSALS), dtype=np.int64)  # 0 for the traversals served by the action, 1 for the others
+        for action, traversals in enumerate(SERVED_TRAVERSALS[:num_actions]):
+            self._waiting[action, traversals] = 0
+        self._forced_waiting = 2 * self._waiting  # as before, a forced decision counts twice for the traversals left waiting
+        self._forced_actions = [FORCED_ACTIONS[traversal] for traversal in range(NUM_TRAVERSALS)]
+        self.reset()
+
+
+    def reset(self):
+        """
+        Put every traversal counter back to zero, at the beginning of every episode
+        """
+        self._counters = np.zeros(NUM_TRAVERSALS, dtype=np.int64)
+
+
+    def choose(self, action):
+        """
+        Return the action to apply instead of the chosen one: the action serving the first traversal
+        that waited more than the threshold, if any, and update the counters of the traversals
+        """
+        if self._threshold <= 0:
+            return action
+
+        if self._counters.max() > self._threshold:
+            action = self._forced_actions[np.argmax(self._counters > self._threshold)]
+            np.add(self._counters, self._forced_waiting[action], out=self._counters)
+        else:
+            np.add(self._counters, self._waiting[action], out=self._counters)
+        np.multiply(self._counters, self._waiting[action], out=self._counters)  # served traversals back to zero
+        return action
+
+
+    @property
+    def counters(self):
+        return self._counters
+
+
+    @property
+    def threshold(self):
+        return self._threshold
@@ -0,0 +1,112 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import sys
+import csv
+import json
+import argparse
+import timeit
+import datetime
+import configparser
+import multiprocessing
+from shutil import copyfile
+
+from generator import TrafficGenerator
+from evaluation import init_sweep_worker, evaluate_model_seed, check_test_model, model_config, episode_metrics, summarize, METRICS
+from eval_cache import EvaluationCache, evaluation_key
+from utils import import_test_configuration, set_sumo
+
+
+def read_model_agent(model_folder_path, config):
+    """
+    Return the number of states and actions a model was trained with, from the settings saved in its folder
+    """
+    content = configparser.ConfigParser()
+    content.read(os.path.join(model_folder_path, 'training_settings.ini'))
+    if not content.has_section('agent'):
+        return config['num_states'], config['num_actions']
+    return content['agent'].getint('num_states'), content['agent'].getint('num_actions')
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Evaluate the models of the sweep on the same seeds')
+    parser.add_argument('--refresh', action='store_true', help='simulate every model and seed again even if its result is cached')
+    parser.add_argument('--clear-cache', action='store_true', help='remove every cached evaluation first')
+    args = parser.parse_args()
+
+    config = import_test_configuration(config_file='testing_settings.ini')
+    sumo_cmd = set_sumo(config['gui'], config['sumocfg_file_name'], config['max_steps'], config['traci_backend'])
+    sweep_path = os.path.join(os.getcwd(), 'sweeps', 'sweep_' + datetime.datetime.now().strftime('%Y%m%d_%H%M%S'), '')
+    os.makedirs(sweep_path, exist_ok=True)
+
+    models = {}
+    for model_folder in config['sweep_models']:
+        if not os.path.isdir(model_folder):
+            sys.exit('The model folder ' + model_folder + ' does not exist')
+        models[model_folder] = (os.path.join(os.getcwd(), model_folder, ''),) + read_model_agent(model_folder, config)
+
+    Cache = EvaluationCache(config['eval_cache_path_name']) if config['eval_cache_path_name'] else None
+    if Cache is not None and args.clear_cache:
+        print('Removed', Cache.clear(), 'cached evaluations')
+
+    # the pairs of model and seed already evaluated with the same settings and network are read from the cache
+    keys = {}
+    results = {}
+    if Cache is not None:
+        for name, (path, num_states, num_actions) in models.items():
+            for seed in config['eval_seeds']:
+                keys[name, seed] = evaluation_key(path, seed, model_config(config, num_states, num_actions))
+                episode = Cache.get(keys[name, seed]) if not args.refresh else None
+                if episode is not None:
+                    results[name, seed] = dict(episode_metrics(config, seed, episode), model=name)
+
+    # the route file of every seed is generated once and shared by all the models
+    route_files = {}
+    for seed in config['eval_seeds']:
+        if all((name, seed) in results for name in models):
+            continue
+        route_files[seed] = os.path.join(sweep_path, 'routes_%d.rou.xml' % seed)
+        TrafficGenerator(config['max_steps'], config['n_cars_generated'], route_files[seed]).generate_routefile(seed)
+
+    jobs = [(config, name, sumo_cmd, seed, route_files[seed]) for seed in route_files for name in models if (name, seed) not in results]
+    # only the models with a job left are loaded by the workers
+    job_models = {name: models[name] for name in set(job[1] for job in jobs)}
+
+    print('\n----- Evaluating', len(models), 'models on', len(config['eval_seeds']), 'seeds with', config['eval_workers'], 'workers,', len(results), 'episodes cached')
+    start_time = timeit.default_timer()
+    if jobs:
+        for name, (path, num_states, num_actions) in job_models.items():
+            check_test_model(model_config(config, num_states, num_actions), path)
+        with multiprocessing.get_context('spawn').Pool(config['eval_workers'], initializer=init_sweep_worker, initargs=(config, job_models)) as pool:
+            for result in pool.starmap(evaluate_model_seed, jobs):
+                episode = result.pop('episode')
+                if Cache is not None:
+                    Cache.put(keys[result['model'], result['seed']], **episode)
+                results[result['model'], result['seed']] = result
+    print('Evaluation time:', round(timeit.default_timer() - start_time, 1), 's')
+    for route_file in route_files.values():
+        os.remove(route_file)
+    results = [results[name, seed] for seed in config['eval_seeds'] for name in models]
+
+    summaries = {name: summarize([result for result in results if result['model'] == name]) for name in models}
+    lines = ['%-24s' % 'model' + ''.join('%34s' % metric for metric in METRICS)]
+    for name, summary in sorted(summaries.items(), key=lambda item: item[1]['average_waiting_time']['mean']):
+        cells = ['%14.2f [%7.2f, %7.2f]' % (summary[metric]['mean'], summary[metric]['ci95_low'], summary[metric]['ci95_high']) for metric in METRICS]
+        lines.append('%-24s' % name + ''.join('%34s' % cell for cell in cells))
+    table = '\n'.join(lines)
+    print(table)
+
+    with open(os.path.join(sweep_path, 'sweep_table.txt'), 'w') as file:
+        file.write('mean [95% confidence interval] over the seeds ' + ', '.join(str(seed) for seed in config['eval_seeds']) + ', best model first\n')
+        file.write(table)
+    with open(os.path.join(sweep_path, 'sweep_summary.json'), 'w') as file:
+        json.dump(summaries, file, indent=4)
+    with open(os.path.join(sweep_path, 'sweep_results.csv'), 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=['model', 'seed', 'simulation_time'] + METRICS)
+        writer.writeheader()
+        writer.writerows(results)
+    copyfile(src='testing_settings.ini', dst=os.path.join(sweep_path, 'testing_settings.ini'))
+
+    print("----- Sweep info saved at:", sweep_path)
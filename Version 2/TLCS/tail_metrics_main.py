@@ -0,0 +1,86 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import sys
+import glob
+import time
+import argparse
+
+from metrics_stream import read_stream, STREAM_FILE_NAME
+
+
+def format_episode(record, total_episodes):
+    """
+    One line of the table of the episodes
+    """
+    return '%5d/%-5s %14.1f %14.1f %8.2f %10.1f %10.1f %10s' % (
+        record['episode'], total_episodes or '?', record['reward'], record['delay'], record['queue'],
+        record['simulation_time'], record['training_time'], record['steps_per_second'])
+
+
+def format_summary(episodes, total_episodes, last_episodes=5):
+    """
+    Summary of the session so far: best episode, trend of the reward and estimated time left
+    """
+    if not episodes:
+        return 'No episode finished yet'
+    best = max(episodes, key=lambda record: record['reward'])
+    recent = episodes[-last_episodes:]
+    duration = sum(record['simulation_time'] + record['training_time'] for record in recent) / len(recent)
+    lines = ['%d episodes - best reward %.1f at episode %d - mean reward of the last %d: %.1f - %.1f s per episode' % (
+        len(episodes), best['reward'], best['episode'], len(recent), sum(record['reward'] for record in recent) / len(recent), duration)]
+    if total_episodes:
+        left = total_episodes - episodes[-1]['episode']
+        lines.append('%d episodes left, about %.1f min' % (left, left * duration / 60))
+    return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Show the episodes of a training session from its metrics stream')
+    parser.add_argument('folder', nargs='?', help='model folder of the session, by default the one written last')
+    parser.add_argument('-f', '--follow', action='store_true', help='keep printing the episodes as they finish, until the session ends')
+    parser.add_argument('--interval', type=float, default=2.0, help='seconds between two reads of the stream when following it')
+    args = parser.parse_args()
+
+    if args.folder:
+        file_path = os.path.join(args.folder, STREAM_FILE_NAME)
+    else:
+        file_paths = glob.glob(os.path.join('models', '*', STREAM_FILE_NAME))
+        if not file_paths:
+            sys.exit('No metrics stream found in the model folders')
+        file_path = max(file_paths, key=os.path.getmtime)
+    if not os.path.isfile(file_path):
+        sys.exit('The metrics stream ' + file_path + ' does not exist')
+
+    print('----- Metrics stream:', file_path)
+    print('%11s %14s %14s %8s %10s %10s %10s' % ('episode', 'reward', 'delay', 'queue', 'sim (s)', 'train (s)', 'steps/s'))
+    total_episodes = None
+    episodes = []
+    decisions = 0
+    offset = 0
+    ended = False
+    while True:
+        records, offset = read_stream(file_path, offset)
+        for record in records:
+            if record['kind'] == 'session':
+                total_episodes = record['total_episodes']
+                ended = False
+                episodes = [episode for episode in episodes if episode['episode'] <= record['start_episode']]  # resumed from a checkpoint
+            elif record['kind'] == 'episode':
+                episodes.append(record)
+                print(format_episode(record, total_episodes))
+            elif record['kind'] == 'decision':
+                decisions += 1
+            elif record['kind'] == 'end':
+                ended = True
+        if ended or not args.follow:
+            break
+        time.sleep(args.interval)
+
+    print(format_summary(episodes, total_episodes))
+    if decisions:
+        print(decisions, 'decisions streamed')
+    if ended:
+        print('----- Session finished')
@@ -2,54 +2,135 @@ from __future__ import absolute_import
 from __future__ import print_function
 
 import os
+import argparse
 from shutil import copyfile
 
-from testing_simulation import Simulation
+from testing_simulation import Simulation, import_traci
 from generator import TrafficGenerator
-from model import TestModel
 from visualization import Visualization
-from utils import import_test_configuration, set_sumo, set_test_path
+from profiler import Profiler
+from traci_wrapper import InstrumentedTraci
+from fake_traci import TraceRecorder
+from decisions import DecisionRecorder, save_decisions
+from eval_cache import EvaluationCache, evaluation_key
+from evaluation import episode_arrays
+from dataset import DatasetWriter
+from utils import import_test_configuration, set_sumo, set_traci, set_test_path
 
 
 if __name__ == "__main__":
 
+    parser = argparse.ArgumentParser(description='Test a trained model on the episode seed of the settings')
+    parser.add_argument('--refresh', action='store_true', help='simulate the episode again even if its result is cached')
+    parser.add_argument('--clear-cache', action='store_true', help='remove every cached evaluation first')
+    args = parser.parse_args()
+
     config = import_test_configuration(config_file='testing_settings.ini')
-    sumo_cmd = set_sumo(config['gui'], config['sumocfg_file_name'], config['max_steps'])
+    sumo_cmd = set_sumo(config['gui'], config['sumocfg_file_name'], config['max_steps'], config['traci_backend'])
     model_path, plot_path = set_test_path(config['models_path_name'], config['model_to_test'])
 
-    Model = TestModel(
-        input_dim=config['num_states'],
-        model_path=model_path
-    )
-
-    TrafficGen = TrafficGenerator(
-        config['max_steps'], 
-        config['n_cars_generated']
-    )
+    Cache = None
+    if config['eval_cache_path_name'] and not (config['profile'] or config['instrument_traci'] or config['record_trace']):  # those need a real run
+        Cache = EvaluationCache(config['eval_cache_path_name'])
+        if args.clear_cache:
+            print('Removed', Cache.clear(), 'cached evaluations')
+        key = evaluation_key(model_path, config['episode_seed'], config)
+    cached = Cache.get(key) if Cache is not None and not args.refresh else None
 
     Visualization = Visualization(
         plot_path, 
-        dpi=96
+        dpi=96,
+        background=config['background_plots']
     )
+
+    if cached is None:
+        Traci = set_traci(config['traci_backend'], config['trace_file'])
+        if config['record_trace']:  # observations of the episode, to be replayed later with traci_backend = trace
+            Traci = Recorder = TraceRecorder(Traci or import_traci())
+        if config['instrument_traci']:
+            Traci = InstrumentedTraci(Traci or import_traci())
+
+        if config['inference_backend'] in ('numpy', 'table'):  # forward pass in numpy on the exported weights, no tensorflow import
+            from numpy_model import NumpyTestModel as TestModel
+        else:
+            from model import TestModel
+
+        Model = TestModel(
+            input_dim=config['num_states'],
+            model_path=model_path
+        )
+
+        if config['inference_backend'] == 'table':  # greedy actions from the precomputed table, the network only outside of it
+            from policy_table import TableTestModel
+            Model = TableModel = TableTestModel(
+                input_dim=config['num_states'],
+                num_actions=config['num_actions'],
+                model_path=model_path,
+                Fallback=Model
+            )
+
+        if config['cache_size'] > 0:  # reuse the action values of states already seen
+            from model_cache import CachedModel
+            Model = CachedModel(Model, config['cache_size'])
+
+        TrafficGen = TrafficGenerator(
+            config['max_steps'], 
+            config['n_cars_generated']
+        )
+
+        Decisions = DecisionRecorder() if Cache is not None or config['record_decisions'] or config['export_dataset'] else None
         
-    Simulation = Simulation(
-        Model,
-        TrafficGen,
-        sumo_cmd,
-        config['max_steps'],
-        config['green_duration'],
-        config['yellow_duration'],
-        config['num_states'],
-        config['num_actions']
-    )
+        Simulation = Simulation(
+            Model,
+            TrafficGen,
+            sumo_cmd,
+            config['max_steps'],
+            config['green_duration'],
+            config['yellow_duration'],
+            config['num_states'],
+            config['num_actions'],
+            Profiler() if config['profile'] else None,
+            Traci,
+            Decisions,
+            starvation_threshold=config['starvation_threshold']
+        )
+
+        print('\n----- Test episode')
+        simulation_time = Simulation.run(config['episode_seed'])  # run the simulation
+        print('Simulation time:', simulation_time, 's')
+        if config['profile']:
+            Simulation.profiler.save(os.path.join(plot_path, 'profile.json'))
+        if config['instrument_traci']:
+            Traci.save_json(os.path.join(plot_path, 'traci_calls.json'))
+            Traci.save_csv(os.path.join(plot_path, 'traci_calls.csv'), config['episode_seed'])
+        if config['record_trace']:
+            Recorder.save(os.path.join(plot_path, 'trace.npz'))
+        if config['inference_backend'] == 'table':
+            print('Policy table hits:', TableModel.hits, '- network fallbacks:', TableModel.misses)
+        if config['cache_size'] > 0:
+            print('State cache', Model.stats())
+
+        reward_episode = Simulation.reward_episode
+        queue_length_episode = Simulation.queue_length_episode
+        decisions = Decisions.to_arrays() if Decisions is not None else None
+        if Cache is not None:
+            Cache.put(key, **episode_arrays(simulation_time, reward_episode, queue_length_episode, Simulation.sum_waiting_times, decisions))
+    else:
+        print('\n----- Test episode: cached result', key[:12], '(use --refresh to simulate it again)')
+        reward_episode = cached['reward_episode'].tolist()
+        queue_length_episode = cached['queue_length_episode'].tolist()
+        decisions = {name[len('decision_'):]: array for name, array in cached.items() if name.startswith('decision_')}
 
-    print('\n----- Test episode')
-    simulation_time = Simulation.run(config['episode_seed'])  # run the simulation
-    print('Simulation time:', simulation_time, 's')
+    if config['record_decisions']:  # replayed against other models with replay_main.py
+        save_decisions(os.path.join(plot_path, 'decisions.npz'), decisions, seed=config['episode_seed'], model=config['model_to_test'])
+    if config['export_dataset']:  # transitions between the decisions, for offline_training_main.py
+        Writer = DatasetWriter(os.path.join(plot_path, 'dataset'))
+        Writer.add_decisions(decisions)
+        Writer.end_episode('seed_%d' % config['episode_seed'], episode=0, seed=config['episode_seed'], source='testing model %d' % config['model_to_test'])
 
     print("----- Testing info saved at:", plot_path)
 
     copyfile(src='testing_settings.ini', dst=os.path.join(plot_path, 'testing_settings.ini'))
 
-    Visualization.save_data_and_plot(data=Simulation.reward_episode, filename='reward', xlabel='Action step', ylabel='Reward')
-    Visualization.save_data_and_plot(data=Simulation.queue_length_episode, filename='queue', xlabel='Step', ylabel='Queue lenght (vehicles)')
+    Visualization.save_data_and_plot(data=reward_episode, filename='reward', xlabel='Action step', ylabel='Reward')
+    Visualization.save_data_and_plot(data=queue_length_episode, filename='queue', xlabel='Step', ylabel='Queue lenght (vehicles)')
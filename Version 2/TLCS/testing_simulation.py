@@ -1,54 +1,34 @@
 import os, sys
-if 'SUMO_HOME' in os.environ:
-    tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
-    sys.path.append(tools)
-else:
-    sys.exit("please declare environment variable 'SUMO_HOME'")
-
-
-import traci
 import numpy as np
 import random
 import timeit
 import os
 
-# phase codes based on environment.net.xml
-PHASE_NS_GREEN = 0  # action 0 code 00
-PHASE_NS_YELLOW = 1
-PHASE_NSL_GREEN = 2  # action 1 code 01
-PHASE_NSL_YELLOW = 3
-PHASE_EW_GREEN = 4  # action 2 code 10
-PHASE_EW_YELLOW = 5
-PHASE_EWL_GREEN = 6  # action 3 code 11
-PHASE_EWL_YELLOW = 7
-PHASE_W_GREEN=8      # action 4 
-PHASE_W_YELLOW=9
-PHASE_E_GREEN=10     # action 5
-PHASE_E_YELLOW=11
-PHASE_N_GREEN=12     # action 6
-PHASE_N_YELLOW=13
-PHASE_S_GREEN=14     # action 7
-PHASE_S_YELLOW=15
-
-
-# traversal codes
-NS=0
-SN=1
-EW=2
-WE=3
-SL=4
-NL=5
-WL=6
-EL=7
+from profiler import NullProfiler
+from starvation import StarvationGuard
+from network import network_of
+
+
+def import_traci():
+    """
+    Import traci from the tools of the SUMO installation, only when a simulation really needs it
+    """
+    if 'SUMO_HOME' in os.environ:
+        tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
+        sys.path.append(tools)
+    else:
+        sys.exit("please declare environment variable 'SUMO_HOME'")
+
+    import traci
+    return traci
 
 
 class Simulation:
    
-    def __init__(self, Model, TrafficGen, sumo_cmd, max_steps, green_duration, yellow_duration, num_states, num_actions):
+    def __init__(self, Model, TrafficGen, sumo_cmd, max_steps, green_duration, yellow_duration, num_states, num_actions, Profiler=None, Traci=None, Recorder=None, label='default', starvation_threshold=10, Network=None):
         self._Model = Model
         self._TrafficGen = TrafficGen
         self._step = 0
-        self._num_traversal = 8
         self._sumo_cmd = sumo_cmd
         self._max_steps = max_steps
         self._green_duration = green_duration
@@ -59,7 +39,14 @@ class Simulation:
         self._queue_length_episode = []
         self._sum_waiting_times = []
         self._sum_waiting_times_c = []
-        self._counter = np.zeros(8)
+        self._Guard = StarvationGuard(starvation_threshold, num_actions)  # forces the green for traversals waiting too long
+        self._Profiler = Profiler if Profiler is not None else NullProfiler()
+        self._traci = Traci if Traci is not None else import_traci()  # e.g. an InstrumentedTraci recording the calls
+        self._Recorder = Recorder  # e.g. a DecisionRecorder logging every decision of the episode
+        self._label = label  # name of the traci connection, several simulations can run side by side with different labels
+        self._connection = self._traci
+        self._Network = Network if Network is not None else network_of(sumo_cmd)  # lanes, edges and phases of the traffic light
+        self._Network.check(num_states, num_actions)
        
        
         
@@ -71,10 +58,17 @@ class Simulation:
         Runs the testing simulation
         """
         start_time = timeit.default_timer()
+        self._Profiler.reset()
+        self._Guard.reset()
+        if self._Recorder is not None:
+            self._Recorder.reset()
 
         # first, generate the route file for this simulation and set up sumo
-        self._TrafficGen.generate_routefile(seed=episode)
-        traci.start(self._sumo_cmd)
+        with self._Profiler.section('generate_routefile'):
+            self._TrafficGen.generate_routefile(seed=episode)
+        with self._Profiler.section('sumo_start'):
+            self._traci.start(self._sumo_cmd, label=self._label)
+            self._connection = self._traci.getConnection(self._label)
         print("Simulating...")
 
         # inits
@@ -86,23 +80,30 @@ class Simulation:
         while self._step < self._max_steps:
 
             # get current state of the intersection
-            current_state = self._get_state()
+            with self._Profiler.section('get_state'):
+                current_state = self._get_state()
 
             # calculate reward of previous action: (change in cumulative waiting time between actions)
             # waiting time = seconds waited by a car since the spawn in the environment, cumulated for every car in incoming lanes
-            current_total_wait = self._collect_waiting_times()
-            reward = -self._get_queue_length()
+            with self._Profiler.section('collect_waiting_times'):
+                current_total_wait = self._collect_waiting_times()
+            with self._Profiler.section('get_queue_length'):
+                reward = -self._get_queue_length()
 
             # choose the light phase to activate, based on the current state of the intersection
             action = self._choose_action(current_state)
+            if self._Recorder is not None:
+                self._Recorder.add(self._step, current_state, action, self._greedy_action, -reward, current_total_wait)
 
             # if the chosen phase is different from the last phase, activate the yellow phase
             if self._step != 0 and old_action != action:
-                self._set_yellow_phase(old_action)
+                with self._Profiler.section('set_phase'):
+                    self._set_yellow_phase(old_action)
                 self._simulate(self._yellow_duration)
 
             # execute the phase selected before
-            self._set_green_phase(action)
+            with self._Profiler.section('set_phase'):
+                self._set_green_phase(action)
             self._simulate(self._green_duration)
 
             # saving variables for later & accumulate reward
@@ -112,7 +113,8 @@ class Simulation:
             self._reward_episode.append(reward)
 
         #print("Total reward:", np.sum(self._reward_episode))
-        traci.close()
+        with self._Profiler.section('sumo_close'):
+            self._connection.close()
         simulation_time = round(timeit.default_timer() - start_time, 1)
 
         return simulation_time
@@ -120,7 +122,8 @@ class Simulation:
     def run_c(self, episode):
         
         self._TrafficGen.generate_routefile(seed=episode)
-        traci.start(self._sumo_cmd)
+        self._traci.start(self._sumo_cmd, label=self._label)
+        self._connection = self._traci.getConnection(self._label)
         print("Simulating...")
         
         #inits
@@ -143,7 +146,7 @@ class Simulation:
                 action = 0
             else:
                 action = action + 1
-        traci.close()    
+        self._connection.close()    
             
             
 
@@ -156,10 +159,12 @@ class Simulation:
             steps_todo = self._max_steps - self._step
 
         while steps_todo > 0:
-            traci.simulationStep()  # simulate 1 step in sumo
+            with self._Profiler.section('simulation_step'):
+                self._connection.simulationStep()  # simulate 1 step in sumo
             self._step += 1 # update the step counter
             steps_todo -= 1
-            wait_time = self._collect_waiting_times()
+            with self._Profiler.section('collect_waiting_times'):
+                wait_time = self._collect_waiting_times()
             self._sum_waiting_times.append(wait_time)
             
     def _simulate_c(self, steps_todo):
@@ -170,7 +175,7 @@ class Simulation:
             steps_todo = self._max_steps - self._step
 
         while steps_todo > 0:
-            traci.simulationStep()  # simulate 1 step in sumo
+            self._connection.simulationStep()  # simulate 1 step in sumo
             self._step += 1 # update the step counter
             steps_todo -= 1
             wait_time = self._collect_waiting_times()
@@ -181,167 +186,56 @@ class Simulation:
         """
         Retrieve the waiting time of every car in the incoming roads
         """
-        car_list = traci.vehicle.getIDList()
+        car_list = self._connection.vehicle.getIDList()
         for car_id in car_list:
-            wait_time = traci.vehicle.getAccumulatedWaitingTime(car_id)
+            wait_time = self._connection.vehicle.getAccumulatedWaitingTime(car_id)
             self._waiting_times[car_id] = wait_time
         total_waiting_time = sum(self._waiting_times.values())
         return total_waiting_time
     
-    def _counterup(self, action):
-    
-        """ Function to increment Counter """
-        if(action==0):
-            self._counter[NS]=0
-            self._counter[SN]=0
-            for i in range(0,self._num_traversal):
-                if i!=NS and i!=SN:
-                    self._counter[i]+=1
-        elif(action==1):
-            self._counter[NL]=0
-            self._counter[SL]=0
-            for i in range(0,self._num_traversal):
-                if i!=NL and i!=SL:
-                    self._counter[i]+=1
-        elif(action==2):
-            self._counter[EW]=0
-            self._counter[WE]=0
-            for i in range(0,self._num_traversal):
-                if i!=EW and i!=EW:
-                    self._counter[i]+=1
-        elif(action==3):
-            self._counter[WL]=0
-            self._counter[EL]=0
-            for i in range(0,self._num_traversal):
-                if i!=WL and i!=EL:
-                    self._counter[i]+=1
-        elif(action==4):
-            self._counter[WE]=0
-            self._counter[WL]=0
-            for i in range(0,self._num_traversal):
-                if i!=WE and i!=WL:
-                    self._counter[i]+=1
-        elif(action==5):
-            self._counter[EW]=0
-            self._counter[EL]=0
-            for i in range(0,self._num_traversal):
-                if i!=EL and i!=EW:
-                    self._counter[i]+=1
-        elif(action==6):
-            self._counter[NS]=0
-            self._counter[NL]=0
-            for i in range(0,self._num_traversal):
-                if i!=NL and i!=NS:
-                    self._counter[i]+=1
-        elif(action==7):
-            self._counter[SL]=0
-            self._counter[SN]=0
-            for i in range(0,self._num_traversal):
-                if i!=SL and i!=SN:
-                    self._counter[i]+=1    
-            
-         
-    def _traversal(self, traversal_number):
-        """choosing action based on preferred traversal """
-        
-        for i in range(0, self._num_traversal):
-            if i!=traversal_number:
-                self._counter[i]+=1
-                
-        if(traversal_number==WE or traversal_number==WL):
-             return 4         
-        if(traversal_number==EW or traversal_number==EL):
-             return 5             
-        if(traversal_number==NS or traversal_number==NL):
-             return 6              
-        if(traversal_number==SN or traversal_number==SL):
-             return 7              
-            
-
     def _choose_action(self, state):
         """
-        Pick the best action known based on the current state of the env. Added Counter Variable.
+        Pick the best action known based on the current state of the env, unless a traversal is starving
         """
-       
-        actions = np.argsort(self._Model.predict_one(state))
-        actions_flatten = [j for sub in actions for j in sub]
-        actions_flatten = np.flip(actions_flatten)
-        for i in range(0,self._num_traversal):
-            if self._counter[i]>10: 
-                action=self._traversal(i)
-                self._counterup(action)
-                return action
-   
-        self._counterup(actions_flatten[0])   
-        return actions_flatten[0]
+        with self._Profiler.section('inference'):
+            q_values = self._Model.predict_one(state)
+        self._greedy_action = self._num_actions - 1 - np.argmax(q_values[0][::-1])  # ties go to the last action; kept for the decision recorder
+        return self._Guard.choose(self._greedy_action)
 
 
     def _set_yellow_phase(self, old_action):
         """
         Activate the correct yellow light combination in sumo
         """
-        yellow_phase_code = old_action * 2 + 1 # obtain the yellow phase code, based on the old action (ref on environment.net.xml)
-        traci.trafficlight.setPhase("TL", yellow_phase_code)
+        self._connection.trafficlight.setPhase(self._Network.tl_id, self._Network.yellow_phases[old_action])  # the phase following the green of the action
 
 
     def _set_green_phase(self, action_number):
         """
         Activate the correct green light combination in sumo
         """
-       
-        if action_number == 0:
-            traci.trafficlight.setPhase("TL", PHASE_NS_GREEN)
-        elif action_number == 1:
-            traci.trafficlight.setPhase("TL", PHASE_NSL_GREEN)
-        elif action_number == 2:
-            traci.trafficlight.setPhase("TL", PHASE_EW_GREEN)
-        elif action_number == 3:
-            traci.trafficlight.setPhase("TL", PHASE_EWL_GREEN)
-        elif action_number == 4:
-            traci.trafficlight.setPhase("TL", PHASE_W_GREEN)
-        elif action_number == 5:
-            traci.trafficlight.setPhase("TL", PHASE_E_GREEN)
-        elif action_number == 6:
-            traci.trafficlight.setPhase("TL", PHASE_N_GREEN)
-        elif action_number == 7:
-            traci.trafficlight.setPhase("TL", PHASE_S_GREEN)    
+        self._connection.trafficlight.setPhase(self._Network.tl_id, self._Network.green_phases[action_number])
 
 
     def _get_queue_length(self):
         """
         Retrieve the number of cars with speed = 0 in every incoming lane
         """
-        halt_N = traci.edge.getLastStepHaltingNumber("N2TL")
-        halt_S = traci.edge.getLastStepHaltingNumber("S2TL")
-        halt_E = traci.edge.getLastStepHaltingNumber("E2TL")
-        halt_W = traci.edge.getLastStepHaltingNumber("W2TL")
-        queue_length = halt_N + halt_S + halt_E + halt_W
-        return queue_length
+        halt = self._connection.edge.getLastStepHaltingNumber
+        return sum([halt(edge_id) for edge_id in self._Network.incoming_edges])
 
 
     def _get_state(self):
         """
         Retrieve the state of the intersection from sumo, in the form of cell occupancy
         """
-        state = np.zeros(self._num_states)
-        state[0] = traci.lane.getLastStepVehicleNumber('W2TL_0') + \
-                        traci.lane.getLastStepVehicleNumber('W2TL_1') + \
-                        traci.lane.getLastStepVehicleNumber('W2TL_2')
-        state[1] = traci.lane.getLastStepVehicleNumber('W2TL_3')
-        state[2] = traci.lane.getLastStepVehicleNumber('N2TL_0') + \
-                        traci.lane.getLastStepVehicleNumber('N2TL_1') + \
-                        traci.lane.getLastStepVehicleNumber('N2TL_2')
-        state[3] = traci.lane.getLastStepVehicleNumber('N2TL_3')
-        state[4] = traci.lane.getLastStepVehicleNumber('E2TL_0') + \
-                        traci.lane.getLastStepVehicleNumber('E2TL_1') + \
-                        traci.lane.getLastStepVehicleNumber('E2TL_2')
-        state[5] = traci.lane.getLastStepVehicleNumber('E2TL_3')
-        state[6] = traci.lane.getLastStepVehicleNumber('S2TL_0') + \
-                        traci.lane.getLastStepVehicleNumber('S2TL_1') + \
-                        traci.lane.getLastStepVehicleNumber('S2TL_2') 
-        state[7] = traci.lane.getLastStepVehicleNumber('S2TL_3') 
-
-        return state
+        vehicle_number = self._connection.lane.getLastStepVehicleNumber
+        return self._Network.state([vehicle_number(lane_id) for lane_id in self._Network.state_lanes])
+
+
+    @property
+    def profiler(self):
+        return self._Profiler
 
 
     @property
@@ -1,17 +1,13 @@
 import os, sys
-if 'SUMO_HOME' in os.environ:
-    tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
-    sys.path.append(tools)
-else:
-    sys.exit("please declare environment variable 'SUMO_HOME'")
-
-
-import traci
 import numpy as np
 import random
 import timeit
 import os
 
+from testing_simulation import import_traci
+
+traci = None  # imported when the first Simulation is created, so that importing this module does not need SUMO
+
 # phase codes based on environment.net.xml
 PHASE_NS_GREEN = 0  # action 0 code 00
 PHASE_NS_YELLOW = 1
@@ -26,6 +22,9 @@ PHASE_EWL_YELLOW = 7
 class Simulation:
    
     def __init__(self, Model, TrafficGen, sumo_cmd, max_steps, green_duration, yellow_duration, num_states, num_actions):
+        global traci
+        if traci is None:
+            traci = import_traci()
         self._Model = Model
         self._TrafficGen = TrafficGen
         self._step = 0
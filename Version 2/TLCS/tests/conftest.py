@@ -0,0 +1,20 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+TLCS_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, TLCS_PATH)  # the modules of TLCS are imported by name, as the entry points do
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """
+    Working directory holding a copy of the intersection, where the generator writes its route file
+    """
+    os.makedirs(os.path.join(tmp_path, 'intersection'))
+    for file_name in ['environment.net.xml', 'sumo_config.sumocfg.xml']:
+        shutil.copy(os.path.join(TLCS_PATH, 'intersection', file_name), os.path.join(tmp_path, 'intersection', file_name))
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+
+from benchmark import write_random_model
+from decisions import DecisionRecorder
+from fake_traci import FakeTraci
+from generator import TrafficGenerator
+from numpy_model import NumpyTestModel
+from testing_simulation import Simulation
+
+MAX_STEPS = 600
+N_CARS = 100
+
+
+def run_episode(seed):
+    """
+    Run a short test episode on the fake backend with a random model, and return its decisions and waiting times
+    """
+    write_random_model(os.getcwd(), 32, num_layers=2)
+    Recorder = DecisionRecorder()
+    Sim = Simulation(
+        NumpyTestModel(8, os.getcwd()),
+        TrafficGenerator(MAX_STEPS, N_CARS),
+        ['sumo', '-c', os.path.join('intersection', 'sumo_config.sumocfg.xml')],
+        MAX_STEPS, 10, 4, 8, 8,
+        Traci=FakeTraci(),
+        Recorder=Recorder
+    )
+    Sim.run(seed)
+    return Recorder.to_arrays(), np.array(Sim.sum_waiting_times)
+
+
+def test_episode_is_deterministic(workspace):
+    decisions, waiting_times = run_episode(10)
+    decisions_again, waiting_times_again = run_episode(10)
+
+    assert len(decisions['actions']) > 0
+    assert waiting_times[-1] > 0
+    np.testing.assert_array_equal(decisions['actions'], decisions_again['actions'])
+    np.testing.assert_array_equal(decisions['states'], decisions_again['states'])
+    np.testing.assert_array_equal(waiting_times, waiting_times_again)
+
+
+def test_seed_changes_the_episode(workspace):
+    _, waiting_times = run_episode(10)
+    _, other_waiting_times = run_episode(11)
+
+    assert not np.array_equal(waiting_times, other_waiting_times)
@@ -0,0 +1,51 @@
+import os
+
+import numpy as np
+import pytest
+
+from metrics import MetricsFile, memmap_npz_member
+
+
+def test_round_trip(tmp_path):
+    file_path = os.path.join(tmp_path, 'metrics.npz')
+    Metrics = MetricsFile(file_path)
+    Metrics.append('reward', -3.5)
+    Metrics.append('reward', [-2.0, -1.0])
+    Metrics.write('delay', np.arange(1000, dtype=np.float64))
+    Metrics.write('empty', [])
+    Metrics.flush()
+    Metrics.append('reward', -0.5)
+    Metrics.write('delay', np.arange(5, dtype=np.int32))  # replaced, not appended
+    Metrics.flush()
+
+    assert sorted(Metrics.columns) == ['delay', 'empty', 'reward']
+    with np.load(file_path) as stored:
+        for name in stored.files:
+            np.testing.assert_array_equal(Metrics.load(name), stored[name])
+            np.testing.assert_array_equal(Metrics.load(name, mmap=False), stored[name])
+    np.testing.assert_array_equal(Metrics.load('reward'), [-3.5, -2.0, -1.0, -0.5])
+    assert isinstance(Metrics.load('reward'), np.memmap)
+    assert Metrics.load('delay').dtype == np.int32
+    assert len(Metrics.load('empty')) == 0  # not memory-mapped, read with np.load
+
+
+def test_missing_column(tmp_path):
+    Metrics = MetricsFile(os.path.join(tmp_path, 'metrics.npz'))
+    assert Metrics.columns == []
+    Metrics.write('reward', [1.0])
+    Metrics.flush()
+    with pytest.raises(KeyError):
+        Metrics.load('queue')
+
+
+def test_memmap_npz_member(tmp_path):
+    file_path = os.path.join(tmp_path, 'arrays.npz')
+    fortran = np.asfortranarray(np.arange(12, dtype=np.float32).reshape(3, 4))
+    np.savez(file_path, first=np.arange(7, dtype=np.uint8), fortran=fortran, empty=np.zeros(0))
+    np.testing.assert_array_equal(memmap_npz_member(file_path, 'first'), np.arange(7))
+    np.testing.assert_array_equal(memmap_npz_member(file_path, 'fortran'), fortran)
+    assert memmap_npz_member(file_path, 'empty') is None
+
+    compressed_file_path = os.path.join(tmp_path, 'compressed.npz')
+    np.savez_compressed(compressed_file_path, first=np.arange(7))
+    assert memmap_npz_member(compressed_file_path, 'first') is None
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from plotting import downsample_minmax
+
+
+def reference_minmax(data, max_points):
+    """
+    Indexes of the minimum and maximum of every bucket, one bucket at a time
+    """
+    bucket_size = -(-len(data) // (max(max_points, 2) // 2))
+    indexes = []
+    for start in range(0, len(data), bucket_size):
+        bucket = data[start:start + bucket_size]
+        indexes += sorted([start + int(np.argmin(bucket)), start + int(np.argmax(bucket))])
+    return np.array(indexes)
+
+
+@pytest.mark.parametrize('num_values, max_points', [
+    (4000, 1000),   # exact multiple of the bucket size
+    (4001, 1000),   # shorter last bucket
+    (6144, 4096),   # buckets of 3 values, two chunks of 1024 buckets ending on the chunk boundary
+    (6146, 4100),   # buckets of 3 values, a third chunk with a single shorter bucket
+    (7001, 4000),   # buckets of 4 values, last chunk partial with a shorter last bucket
+    (100000, 7),    # odd max_points
+    (10, 1),        # max_points below 2 keeps one bucket
+    (10, 0),
+])
+def test_downsample_minmax(num_values, max_points):
+    data = np.random.RandomState(num_values).standard_normal(num_values)
+    indexes, values = downsample_minmax(data, max_points)
+
+    np.testing.assert_array_equal(indexes, reference_minmax(data, max_points))
+    np.testing.assert_array_equal(values, data[indexes])
+    assert len(indexes) <= max(max_points, 2)
+    assert np.all(np.diff(indexes) >= 0)
+    assert data.argmin() in indexes and data.argmax() in indexes
+
+
+def test_short_series_is_kept():
+    data = np.arange(5.0)
+    indexes, values = downsample_minmax(data, 10)
+    np.testing.assert_array_equal(indexes, np.arange(5))
+    np.testing.assert_array_equal(values, data)
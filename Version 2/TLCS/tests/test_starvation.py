@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from starvation import StarvationGuard, NUM_TRAVERSALS, NS, SN, EW, WE, SL, NL, WL, EL
+
+
+class OldCounters:  # _counterup and _traversal of the simulations before StarvationGuard, with a threshold of 10
+    def __init__(self, fix_action_2=True):
+        self._counter = np.zeros(NUM_TRAVERSALS)
+        self._fix_action_2 = fix_action_2
+
+
+    def _counterup(self, action):
+        served = {0: (NS, SN), 1: (NL, SL), 2: (EW, WE), 3: (WL, EL), 4: (WE, WL), 5: (EW, EL), 6: (NS, NL), 7: (SL, SN)}[action]
+        for traversal in served:
+            self._counter[traversal] = 0
+        if action == 2 and not self._fix_action_2:
+            served = (EW, EW)  # the old check 'i!=EW and i!=EW' also incremented WE
+        for i in range(NUM_TRAVERSALS):
+            if i not in served:
+                self._counter[i] += 1
+
+
+    def _traversal(self, traversal_number):
+        for i in range(NUM_TRAVERSALS):
+            if i != traversal_number:
+                self._counter[i] += 1
+        if traversal_number in (WE, WL):
+            return 4
+        if traversal_number in (EW, EL):
+            return 5
+        if traversal_number in (NS, NL):
+            return 6
+        if traversal_number in (SN, SL):
+            return 7
+
+
+    def choose(self, action):
+        for i in range(NUM_TRAVERSALS):
+            if self._counter[i] > 10:
+                action = self._traversal(i)
+                self._counterup(action)
+                return action
+        self._counterup(action)
+        return action
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_guard_matches_old_counters(seed):
+    rng = np.random.RandomState(seed)
+    Guard = StarvationGuard(10)
+    Old = OldCounters()
+    forced = 0
+    for greedy in rng.choice(8, size=2000, p=[0.4, 0.05, 0.3, 0.05, 0.05, 0.05, 0.05, 0.05]):
+        action = Guard.choose(greedy)
+        assert action == Old.choose(greedy)
+        np.testing.assert_array_equal(Guard.counters, Old._counter)
+        forced += action != greedy
+    assert forced > 0  # the sequences did starve some traversals
+
+
+def test_action_2_resets_the_west_east_counter():
+    Guard = StarvationGuard(10)
+    Old = OldCounters(fix_action_2=False)
+    for greedy in [0, 0, 2]:
+        Guard.choose(greedy)
+        Old.choose(greedy)
+    assert Guard.counters[WE] == 0
+    assert Old._counter[WE] == 1  # the old counters did not serve WE on action 2
+
+
+def test_disabled_guard_keeps_the_action():
+    Guard = StarvationGuard(0)
+    assert [Guard.choose(0) for _ in range(50)] == [0] * 50
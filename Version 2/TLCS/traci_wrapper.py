@@ -0,0 +1,140 @@
+import csv
+import json
+import math
+import os
+import timeit
+
+
+# traci domains used by the simulations, every call made through them is recorded
+DOMAINS = ('simulation', 'vehicle', 'lane', 'edge', 'trafficlight')
+
+BUCKETS_PER_OCTAVE = 4  # resolution of the latency histograms: 4 buckets every time the latency doubles
+
+
+class InstrumentedTraci:
+    def __init__(self, traci_module):
+        self._traci = traci_module
+        self._histograms = {}  # 'domain.method' -> {bucket: count}
+        self._total_times = {}
+        for domain in DOMAINS:
+            setattr(self, domain, _InstrumentedDomain(getattr(traci_module, domain), domain, self))
+
+
+    def __getattr__(self, name):
+        """
+        Wrap the top level traci functions (start, close, simulationStep...) the first time they are used
+        """
+        attribute = getattr(self._traci, name)
+        if callable(attribute):
+            attribute = _timed(attribute, name, self)
+            setattr(self, name, attribute)
+        return attribute
+
+
+    def getConnection(self, label='default'):
+        """
+        Return the labeled connection of traci, its calls recorded together with those made through this wrapper
+        """
+        Connection = InstrumentedTraci(self._traci.getConnection(label))
+        Connection.record = self.record
+        return Connection
+
+
+    def record(self, name, elapsed):
+        """
+        Account one call of name that lasted elapsed seconds
+        """
+        bucket = math.floor(BUCKETS_PER_OCTAVE * math.log2(max(elapsed * 1e6, 0.01)))
+        histogram = self._histograms.setdefault(name, {})
+        histogram[bucket] = histogram.get(bucket, 0) + 1
+        self._total_times[name] = self._total_times.get(name, 0.0) + elapsed
+
+
+    def reset(self):
+        """
+        Forget the calls recorded so far, at the beginning of every episode
+        """
+        self._histograms = {}
+        self._total_times = {}
+
+
+    def summary(self):
+        """
+        Return the calls count, total time and latency percentiles (upper bound of the histogram bucket) of every method
+        """
+        summary = {}
+        for name in sorted(self._histograms):
+            histogram = self._histograms[name]
+            calls = sum(histogram.values())
+            summary[name] = {
+                'calls': calls,
+                'total_ms': round(1e3 * self._total_times[name], 3),
+                'p50_us': _percentile(histogram, calls, 0.50),
+                'p95_us': _percentile(histogram, calls, 0.95),
+                'p99_us': _percentile(histogram, calls, 0.99)
+            }
+        return summary
+
+
+    def save_json(self, file_path):
+        """
+        Write the summary of the calls as json
+        """
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w') as file:
+            json.dump(self.summary(), file, indent=4)
+
+
+    def save_csv(self, file_path, episode):
+        """
+        Append the summary of the calls of the episode to a csv file, one row per method
+        """
+        fields = ['episode', 'method', 'calls', 'total_ms', 'p50_us', 'p95_us', 'p99_us']
+        write_header = not os.path.isfile(file_path)
+        with open(file_path, 'a', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=fields)
+            if write_header:
+                writer.writeheader()
+            for name, stats in self.summary().items():
+                writer.writerow(dict(stats, episode=episode, method=name))
+
+
+class _InstrumentedDomain:
+    def __init__(self, domain, domain_name, Recorder):
+        self._domain = domain
+        self._domain_name = domain_name
+        self._Recorder = Recorder
+
+
+    def __getattr__(self, name):
+        """
+        Wrap the methods of the domain the first time they are used
+        """
+        attribute = getattr(self._domain, name)
+        if callable(attribute):
+            attribute = _timed(attribute, self._domain_name + '.' + name, self._Recorder)
+            setattr(self, name, attribute)
+        return attribute
+
+
+def _timed(function, name, Recorder):
+    """
+    Return a version of function recording the duration of every call
+    """
+    def timed_function(*args, **kwargs):
+        start_time = timeit.default_timer()
+        result = function(*args, **kwargs)
+        Recorder.record(name, timeit.default_timer() - start_time)
+        return result
+    return timed_function
+
+
+def _percentile(histogram, calls, fraction):
+    """
+    Upper latency bound in microseconds of the bucket containing the given fraction of the calls
+    """
+    cumulated = 0
+    for bucket in sorted(histogram):
+        cumulated += histogram[bucket]
+        if cumulated >= fraction * calls:
+            return round(2 ** ((bucket + 1) / BUCKETS_PER_OCTAVE), 1)
@@ -2,30 +2,53 @@ from __future__ import absolute_import
 from __future__ import print_function
 
 import os
+import argparse
 import datetime
 from shutil import copyfile
 
-from training_simulation import Simulation
+from training_simulation import Simulation, import_traci
 from generator import TrafficGenerator
 from memory import Memory
-from model import TrainModel
 from visualization import Visualization
-from utils import import_train_configuration, set_sumo, set_train_path
+from checkpoint import save_checkpoint, load_checkpoint
+from profiler import Profiler
+from traci_wrapper import InstrumentedTraci
+from dataset import DatasetWriter, RecordingMemory
+from metrics_stream import MetricsStream, STREAM_FILE_NAME
+from catalog import open_catalog
+from utils import import_train_configuration, set_sumo, set_traci, set_train_path
 
 
 if __name__ == "__main__":
 
-    config = import_train_configuration(config_file='training_settings.ini')
-    sumo_cmd = set_sumo(config['gui'], config['sumocfg_file_name'], config['max_steps'])
-    path = set_train_path(config['models_path_name'])
+    parser = argparse.ArgumentParser(description='Train the traffic light agent')
+    parser.add_argument('--resume', metavar='MODEL_PATH', help='continue the session saved in this model folder from its last checkpoint')
+    args = parser.parse_args()
 
+    if args.resume:
+        path = os.path.join(args.resume, '')
+        config = import_train_configuration(config_file=os.path.join(path, 'training_settings.ini'))
+    else:
+        config = import_train_configuration(config_file='training_settings.ini')
+        path = set_train_path(config['models_path_name'])
+        copyfile(src='training_settings.ini', dst=os.path.join(path, 'training_settings.ini'))
+    sumo_cmd = set_sumo(config['gui'], config['sumocfg_file_name'], config['max_steps'], config['traci_backend'])
+    Catalog = open_catalog(path)  # index of the sessions of the models folder, see catalog_main.py
+    Catalog.start_run(path, 'training', config)
+
+    Traci = set_traci(config['traci_backend'], config['trace_file'])
+    if config['instrument_traci']:
+        Traci = InstrumentedTraci(Traci or import_traci())
+
+    from model import TrainModel  # tensorflow is imported only once the configuration is read
     Model = TrainModel(
         config['num_layers'], 
         config['width_layers'], 
         config['batch_size'], 
         config['learning_rate'], 
         input_dim=config['num_states'], 
-        output_dim=config['num_actions']
+        output_dim=config['num_actions'],
+        target_network=config['target_network']
     )
 
     Memory = Memory(
@@ -33,6 +56,10 @@ if __name__ == "__main__":
         config['memory_size_min']
     )
 
+    if config['export_dataset']:  # every transition is also written to disk, for offline_training_main.py
+        Writer = DatasetWriter(os.path.join(path, 'dataset'))
+        Memory = RecordingMemory(Memory, Writer)
+
     TrafficGen = TrafficGenerator(
         config['max_steps'], 
         config['n_cars_generated']
@@ -40,9 +67,13 @@ if __name__ == "__main__":
 
     Visualization = Visualization(
         path, 
-        dpi=96
+        dpi=96,
+        background=config['background_plots']
     )
-        
+
+    # appended during the session, to be followed with tail_metrics_main.py
+    Stream = MetricsStream(os.path.join(path, STREAM_FILE_NAME)) if config['stream_metrics'] else None
+
     Simulation = Simulation(
         Model,
         Memory,
@@ -54,26 +85,79 @@ if __name__ == "__main__":
         config['yellow_duration'],
         config['num_states'],
         config['num_actions'],
-        config['training_epochs']
+        config['training_epochs'],
+        config['target_sync_every'],
+        config['target_sync_unit'],
+        Profiler() if config['profile'] else None,
+        Traci,
+        config['starvation_threshold'],
+        Stream if config['stream_decisions'] else None
     )
     
     episode = 0
     timestamp_start = datetime.datetime.now()
+    simulated_episodes = 0
+    simulated_time = 0
+
+    if args.resume:
+        episode = load_checkpoint(path, Model, Memory, Simulation)
+        print('\n----- Resuming session from episode', str(episode+1))
+        Visualization.metrics.write('reward', Simulation.reward_store)  # drop the episodes run after the checkpoint
+        Visualization.metrics.write('delay', Simulation.cumulative_wait_store)
+        Visualization.metrics.write('queue', Simulation.avg_queue_length_store)
+
+    if Stream is not None:
+        Stream.write('session', start_episode=episode, total_episodes=config['total_episodes'], max_steps=config['max_steps'],
+                     n_cars_generated=config['n_cars_generated'], resumed=bool(args.resume))
+        Stream.flush()
     
     while episode < config['total_episodes']:
         print('\n----- Episode', str(episode+1), 'of', str(config['total_episodes']))
         epsilon = 1.0 - (episode / config['total_episodes'])  # set the epsilon for this episode according to epsilon-greedy policy
+        if Stream is not None:
+            Stream.start_episode(episode+1)
         simulation_time, training_time = Simulation.run(episode, epsilon)  # run the simulation
         print('Simulation time:', simulation_time, 's - Training time:', training_time, 's - Total:', round(simulation_time+training_time, 1), 's')
+        Visualization.metrics.append('reward', Simulation.reward_store[-1])  # written to the metrics file at the checkpoints, the stream has every episode
+        Visualization.metrics.append('delay', Simulation.cumulative_wait_store[-1])
+        Visualization.metrics.append('queue', Simulation.avg_queue_length_store[-1])
+        if Stream is not None:
+            Stream.write('episode', episode=episode+1, epsilon=round(epsilon, 4), reward=float(Simulation.reward_store[-1]),
+                         delay=float(Simulation.cumulative_wait_store[-1]), queue=float(Simulation.avg_queue_length_store[-1]),
+                         simulation_time=simulation_time, training_time=training_time,
+                         steps_per_second=round(config['max_steps'] / simulation_time, 1) if simulation_time else None,
+                         epochs_per_second=round(config['training_epochs'] / training_time, 1) if training_time else None)
+            Stream.flush()
+        Catalog.update_run(path, episodes=episode+1)
+        simulated_episodes += 1
+        simulated_time += simulation_time
+        if config['export_dataset']:
+            Writer.end_episode('episode_%05d' % (episode+1), episode=episode+1, seed=episode, source='training')
+        if config['profile']:
+            Simulation.profiler.save(os.path.join(path, 'profile', 'episode_' + str(episode+1) + '.json'))
+        if config['instrument_traci']:
+            Traci.save_json(os.path.join(path, 'traci', 'episode_' + str(episode+1) + '.json'))
+            Traci.save_csv(os.path.join(path, 'traci', 'traci_calls.csv'), episode+1)
+            Traci.reset()
         episode += 1
 
+        if config['checkpoint_every'] > 0 and episode % config['checkpoint_every'] == 0:
+            save_checkpoint(path, episode-1, epsilon, Model, Memory, Simulation)
+            Visualization.metrics.flush()  # rewrites the whole file, so only once per checkpoint
+            Model.save_model(path)  # the model of the last checkpoint can already be tested
+
     print("\n----- Start time:", timestamp_start)
     print("----- End time:", datetime.datetime.now())
     print("----- Session info saved at:", path)
+    if Stream is not None:
+        Stream.write('end', episodes=episode, duration=round((datetime.datetime.now() - timestamp_start).total_seconds(), 1))
+        Stream.close()
 
     Model.save_model(path)
-
-    copyfile(src='training_settings.ini', dst=os.path.join(path, 'training_settings.ini'))
+    Catalog.end_run(path, episodes=episode,
+                    steps_per_second=round(simulated_episodes * config['max_steps'] / simulated_time, 1) if simulated_time else None,
+                    metrics={'reward': Simulation.reward_store[-1], 'delay': Simulation.cumulative_wait_store[-1],
+                             'queue': Simulation.avg_queue_length_store[-1], 'best_reward': max(Simulation.reward_store)})
 
     Visualization.save_data_and_plot(data=Simulation.reward_store, filename='reward', xlabel='Episode', ylabel='Cumulative negative reward')
     Visualization.save_data_and_plot(data=Simulation.cumulative_wait_store, filename='delay', xlabel='Episode', ylabel='Cumulative delay (s)')
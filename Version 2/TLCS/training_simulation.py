@@ -1,38 +1,29 @@
 import os, sys
-if 'SUMO_HOME' in os.environ:
-    tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
-    sys.path.append(tools)
-else:
-    sys.exit("please declare environment variable 'SUMO_HOME'")
-
-import traci
 import numpy as np
 import random
 import timeit
 
+from profiler import NullProfiler
+from starvation import StarvationGuard
+from network import network_of
+
 
-# phase codes based on environment.net.xml
-PHASE_NS_GREEN = 0  # action 0 code 00
-PHASE_NS_YELLOW = 1
-PHASE_NSL_GREEN = 2  # action 1 code 01
-PHASE_NSL_YELLOW = 3
-PHASE_EW_GREEN = 4  # action 2 code 10
-PHASE_EW_YELLOW = 5
-PHASE_EWL_GREEN = 6  # action 3 code 11
-PHASE_EWL_YELLOW = 7
-PHASE_W_GREEN=8         # action 4 
-PHASE_W_YELLOW=9
-PHASE_E_GREEN=10         # action 5
-PHASE_E_YELLOW=11
-PHASE_N_GREEN=12          # action 6
-PHASE_N_YELLOW=13
-PHASE_S_GREEN=14            # action 7
-PHASE_S_YELLOW=15
+def import_traci():
+    """
+    Import traci from the tools of the SUMO installation, only when a simulation really needs it
+    """
+    if 'SUMO_HOME' in os.environ:
+        tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
+        sys.path.append(tools)
+    else:
+        sys.exit("please declare environment variable 'SUMO_HOME'")
 
+    import traci
+    return traci
 
 
 class Simulation:
-    def __init__(self, Model, Memory, TrafficGen, sumo_cmd, gamma, max_steps, green_duration, yellow_duration, num_states, num_actions, training_epochs):
+    def __init__(self, Model, Memory, TrafficGen, sumo_cmd, gamma, max_steps, green_duration, yellow_duration, num_states, num_actions, training_epochs, target_sync_every=1, target_sync_unit='episodes', Profiler=None, Traci=None, starvation_threshold=0, Recorder=None, Network=None):
         self._Model = Model
         self._Memory = Memory
         self._TrafficGen = TrafficGen
@@ -48,6 +39,16 @@ class Simulation:
         self._cumulative_wait_store = []
         self._avg_queue_length_store = []
         self._training_epochs = training_epochs
+        self._target_sync_every = target_sync_every  # only used if the model has a target network
+        self._target_sync_unit = target_sync_unit  # 'episodes' or 'steps' (replay steps)
+        self._replay_steps = 0
+        self._Profiler = Profiler if Profiler is not None else NullProfiler()
+        self._traci = Traci if Traci is not None else import_traci()  # e.g. an InstrumentedTraci recording the calls
+        self._Guard = StarvationGuard(starvation_threshold, num_actions)  # same constraint as in testing, disabled with 0
+        self._Recorder = Recorder  # e.g. a MetricsStream writing every decision of the episode
+        self._Network = Network if Network is not None else network_of(sumo_cmd)  # lanes, edges and phases of the traffic light
+        self._Network.check(num_states, num_actions)
+        self._incoming_roads = frozenset(self._Network.incoming_edges)
 
 
     def run(self, episode, epsilon):
@@ -55,10 +56,16 @@ class Simulation:
         Runs an episode of simulation, then starts a training session
         """
         start_time = timeit.default_timer()
+        self._Profiler.reset()
+        self._Guard.reset()
+        if self._Recorder is not None:
+            self._Recorder.reset()
 
         # first, generate the route file for this simulation and set up sumo
-        self._TrafficGen.generate_routefile(seed=episode)
-        traci.start(self._sumo_cmd)
+        with self._Profiler.section('generate_routefile'):
+            self._TrafficGen.generate_routefile(seed=episode)
+        with self._Profiler.section('sumo_start'):
+            self._traci.start(self._sumo_cmd)
         print("Simulating...")
 
         # inits
@@ -74,27 +81,35 @@ class Simulation:
         while self._step < self._max_steps:
 
             # get current state of the intersection
-            current_state = self._get_state()
+            with self._Profiler.section('get_state'):
+                current_state = self._get_state()
 
             # calculate reward of previous action: (change in cumulative waiting time between actions)
             # waiting time = seconds waited by a car since the spawn in the environment, cumulated for every car in incoming lanes
-            current_total_wait = self._collect_waiting_times()
-            reward = -self._get_queue_length()
+            with self._Profiler.section('collect_waiting_times'):
+                current_total_wait = self._collect_waiting_times()
+            with self._Profiler.section('get_queue_length'):
+                reward = -self._get_queue_length()
 
             # saving the data into the memory
             if self._step != 0:
-                self._Memory.add_sample((old_state, old_action, reward, current_state))
+                with self._Profiler.section('memory_add_sample'):
+                    self._Memory.add_sample((old_state, old_action, reward, current_state))
 
             # choose the light phase to activate, based on the current state of the intersection
             action = self._choose_action(current_state, epsilon)
+            if self._Recorder is not None:
+                self._Recorder.add(self._step, current_state, action, self._greedy_action, -reward, current_total_wait)
 
             # if the chosen phase is different from the last phase, activate the yellow phase
             if self._step != 0 and old_action != action:
-                self._set_yellow_phase(old_action)
+                with self._Profiler.section('set_phase'):
+                    self._set_yellow_phase(old_action)
                 self._simulate(self._yellow_duration)
 
             # execute the phase selected before
-            self._set_green_phase(action)
+            with self._Profiler.section('set_phase'):
+                self._set_green_phase(action)
             self._simulate(self._green_duration)
 
             # saving variables for later & accumulate reward
@@ -108,11 +123,19 @@ class Simulation:
 
         self._save_episode_stats()
         print("Total reward:", self._sum_neg_reward, "- Epsilon:", round(epsilon, 2))
-        traci.close()
+        with self._Profiler.section('sumo_close'):
+            self._traci.close()
         simulation_time = round(timeit.default_timer() - start_time, 1)
 
         print("Training...")
         start_time = timeit.default_timer()
+        self._Model.set_random_seed(episode)  # make training reproducible, also when resumed from a checkpoint
+        if self._Model.has_target_network:
+            if self._target_sync_unit == 'episodes' and episode % self._target_sync_every == 0:
+                self._sync_target()
+            else:
+                with self._Profiler.section('target_cache_update'):
+                    self._Memory.update_targets(self._compute_targets, only_missing=True)  # only the samples of this episode
         for _ in range(self._training_epochs):
             self._replay()
         training_time = round(timeit.default_timer() - start_time, 1)
@@ -128,10 +151,12 @@ class Simulation:
             steps_todo = self._max_steps - self._step
 
         while steps_todo > 0:
-            traci.simulationStep()  # simulate 1 step in sumo
+            with self._Profiler.section('simulation_step'):
+                self._traci.simulationStep()  # simulate 1 step in sumo
             self._step += 1 # update the step counter
             steps_todo -= 1
-            queue_length = self._get_queue_length()
+            with self._Profiler.section('get_queue_length'):
+                queue_length = self._get_queue_length()
             self._sum_queue_length += queue_length
             self._sum_waiting_time += queue_length # 1 step while wating in queue means 1 second waited, for each car, therefore queue_lenght == waited_seconds
 
@@ -140,12 +165,11 @@ class Simulation:
         """
         Retrieve the waiting time of every car in the incoming roads
         """
-        incoming_roads = ["E2TL", "N2TL", "W2TL", "S2TL"]
-        car_list = traci.vehicle.getIDList()
+        car_list = self._traci.vehicle.getIDList()
         for car_id in car_list:
-            wait_time = traci.vehicle.getAccumulatedWaitingTime(car_id)
-            road_id = traci.vehicle.getRoadID(car_id)  # get the road id where the car is located
-            if road_id in incoming_roads:  # consider only the waiting times of cars in incoming roads
+            wait_time = self._traci.vehicle.getAccumulatedWaitingTime(car_id)
+            road_id = self._traci.vehicle.getRoadID(car_id)  # get the road id where the car is located
+            if road_id in self._incoming_roads:  # consider only the waiting times of cars in incoming roads
                 self._waiting_times[car_id] = wait_time
             else:
                 if car_id in self._waiting_times: # a car that was tracked has cleared the intersection
@@ -156,94 +180,68 @@ class Simulation:
 
     def _choose_action(self, state, epsilon):
         """
-        Decide wheter to perform an explorative or exploitative action, according to an epsilon-greedy policy
+        Decide wheter to perform an explorative or exploitative action, according to an epsilon-greedy policy,
+        then give the green to the starving traversals if the starvation guard is enabled
         """
         if random.random() < epsilon:
-            return random.randint(0, self._num_actions - 1) # random action
+            action = random.randint(0, self._num_actions - 1) # random action
+            self._greedy_action = -1  # kept for the decision recorder
         else:
-            return np.argmax(self._Model.predict_one(state)) # the best action given the current state
+            with self._Profiler.section('inference'):
+                q_values = self._Model.predict_one(state)
+            action = self._greedy_action = np.argmax(q_values) # the best action given the current state
+        return self._Guard.choose(action)
 
 
     def _set_yellow_phase(self, old_action):
         """
         Activate the correct yellow light combination in sumo
         """
-        yellow_phase_code = old_action * 2 + 1 # obtain the yellow phase code, based on the old action (ref on environment.net.xml)
-        traci.trafficlight.setPhase("TL", yellow_phase_code)
+        self._traci.trafficlight.setPhase(self._Network.tl_id, self._Network.yellow_phases[old_action])  # the phase following the green of the action
 
 
     def _set_green_phase(self, action_number):
         """
         Activate the correct green light combination in sumo
         """
-        if action_number == 0:
-            traci.trafficlight.setPhase("TL", PHASE_NS_GREEN)
-        elif action_number == 1:
-            traci.trafficlight.setPhase("TL", PHASE_NSL_GREEN)
-        elif action_number == 2:
-            traci.trafficlight.setPhase("TL", PHASE_EW_GREEN)
-        elif action_number == 3:
-            traci.trafficlight.setPhase("TL", PHASE_EWL_GREEN)
-        elif action_number == 4:
-            traci.trafficlight.setPhase("TL", PHASE_W_GREEN)
-        elif action_number == 5:
-            traci.trafficlight.setPhase("TL", PHASE_E_GREEN)
-        elif action_number == 6:
-            traci.trafficlight.setPhase("TL", PHASE_N_GREEN)
-        elif action_number == 7:
-            traci.trafficlight.setPhase("TL", PHASE_S_GREEN)    
+        self._traci.trafficlight.setPhase(self._Network.tl_id, self._Network.green_phases[action_number])
 
 
     def _get_queue_length(self):
         """
         Retrieve the number of cars with speed = 0 in every incoming lane
         """
-        halt_N = traci.edge.getLastStepHaltingNumber("N2TL")
-        halt_S = traci.edge.getLastStepHaltingNumber("S2TL")
-        halt_E = traci.edge.getLastStepHaltingNumber("E2TL")
-        halt_W = traci.edge.getLastStepHaltingNumber("W2TL")
-        queue_length = halt_N + halt_S + halt_E + halt_W
-        return queue_length
+        halt = self._traci.edge.getLastStepHaltingNumber
+        return sum([halt(edge_id) for edge_id in self._Network.incoming_edges])
 
 
     def _get_state(self):
         """
         Retrieve the state of the intersection from sumo, in the form of cell occupancy
         """
-        state = np.zeros(self._num_states)
-        state[0] = traci.lane.getLastStepVehicleNumber('W2TL_0') + \
-                        traci.lane.getLastStepVehicleNumber('W2TL_1') + \
-                        traci.lane.getLastStepVehicleNumber('W2TL_2')
-        state[1] = traci.lane.getLastStepVehicleNumber('W2TL_3')
-        state[2] = traci.lane.getLastStepVehicleNumber('N2TL_0') + \
-                        traci.lane.getLastStepVehicleNumber('N2TL_1') + \
-                        traci.lane.getLastStepVehicleNumber('N2TL_2')
-        state[3] = traci.lane.getLastStepVehicleNumber('N2TL_3')
-        state[4] = traci.lane.getLastStepVehicleNumber('E2TL_0') + \
-                        traci.lane.getLastStepVehicleNumber('E2TL_1') + \
-                        traci.lane.getLastStepVehicleNumber('E2TL_2')
-        state[5] = traci.lane.getLastStepVehicleNumber('E2TL_3')
-        state[6] = traci.lane.getLastStepVehicleNumber('S2TL_0') + \
-                        traci.lane.getLastStepVehicleNumber('S2TL_1') + \
-                        traci.lane.getLastStepVehicleNumber('S2TL_2') 
-        state[7] = traci.lane.getLastStepVehicleNumber('S2TL_3') 
-
-        return state
+        vehicle_number = self._traci.lane.getLastStepVehicleNumber
+        return self._Network.state([vehicle_number(lane_id) for lane_id in self._Network.state_lanes])
 
 
     def _replay(self):
         """
         Retrieve a group of samples from the memory and for each of them update the learning equation, then train
         """
-        batch = self._Memory.get_samples(self._Model.batch_size)
+        with self._Profiler.section('replay_sampling'):
+            if self._Model.has_target_network:
+                batch, max_q_next = self._Memory.get_samples_with_targets(self._Model.batch_size)  # targets cached at the last sync
+            else:
+                batch = self._Memory.get_samples(self._Model.batch_size)
 
         if len(batch) > 0:  # if the memory is full enough
+            target_start = timeit.default_timer()
             states = np.array([val[0] for val in batch])  # extract states from the batch
-            next_states = np.array([val[3] for val in batch])  # extract next states from the batch
 
             # prediction
             q_s_a = self._Model.predict_batch(states)  # predict Q(state), for every sample
-            q_s_a_d = self._Model.predict_batch(next_states)  # predict Q(next_state), for every sample
+            if not self._Model.has_target_network:
+                next_states = np.array([val[3] for val in batch])  # extract next states from the batch
+                max_q_next = np.amax(self._Model.predict_batch(next_states), axis=1)  # predict Q(next_state), for every sample
 
             # setup training arrays
             x = np.zeros((len(batch), self._num_states))
@@ -252,11 +250,35 @@ class Simulation:
             for i, b in enumerate(batch):
                 state, action, reward, _ = b[0], b[1], b[2], b[3]  # extract data from one sample
                 current_q = q_s_a[i]  # get the Q(state) predicted before
-                current_q[action] = reward + self._gamma * np.amax(q_s_a_d[i])  # update Q(state, action)
+                current_q[action] = reward + self._gamma * max_q_next[i]  # update Q(state, action)
                 x[i] = state
                 y[i] = current_q  # Q(state) that includes the updated action value
 
-            self._Model.train_batch(x, y)  # train the NN
+            self._Profiler.add('replay_targets', timeit.default_timer() - target_start)
+
+            with self._Profiler.section('fit'):
+                self._Model.train_batch(x, y)  # train the NN
+
+            self._replay_steps += 1
+            if self._Model.has_target_network and self._target_sync_unit == 'steps' and self._replay_steps % self._target_sync_every == 0:
+                self._sync_target()
+
+
+    def _sync_target(self):
+        """
+        Synchronize the target network and recompute the cached targets of the whole memory in one batched pass
+        """
+        with self._Profiler.section('target_sync'):
+            self._Model.sync_target()
+            self._Memory.update_targets(self._compute_targets)
+
+
+    def _compute_targets(self, samples):
+        """
+        Compute max Q(next_state) with the target network for a list of samples
+        """
+        next_states = np.array([val[3] for val in samples])
+        return np.amax(self._Model.predict_target_batch(next_states), axis=1)
 
 
     def _save_episode_stats(self):
@@ -268,6 +290,33 @@ class Simulation:
         self._avg_queue_length_store.append(self._sum_queue_length / self._max_steps)  # average number of queued cars per step, in this episode
 
 
+    def get_checkpoint_state(self):
+        """
+        Return the statistics and counters to save in a checkpoint
+        """
+        return {
+            'reward_store': self._reward_store,
+            'cumulative_wait_store': self._cumulative_wait_store,
+            'avg_queue_length_store': self._avg_queue_length_store,
+            'replay_steps': self._replay_steps
+        }
+
+
+    def load_checkpoint_state(self, state):
+        """
+        Restore the statistics and counters returned by get_checkpoint_state()
+        """
+        self._reward_store = state['reward_store']
+        self._cumulative_wait_store = state['cumulative_wait_store']
+        self._avg_queue_length_store = state['avg_queue_length_store']
+        self._replay_steps = state['replay_steps']
+
+
+    @property
+    def profiler(self):
+        return self._Profiler
+
+
     @property
     def reward_store(self):
         return self._reward_store
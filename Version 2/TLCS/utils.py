@@ -1,6 +1,6 @@
 import configparser
-from sumolib import checkBinary
 import os
+import re
 import sys
 
 
@@ -13,6 +13,14 @@ def import_train_configuration(config_file):
     config = {}
     config['gui'] = content['simulation'].getboolean('gui')
     config['total_episodes'] = content['simulation'].getint('total_episodes')
+    config['checkpoint_every'] = content['simulation'].getint('checkpoint_every', fallback=0)
+    config['profile'] = content['simulation'].getboolean('profile', fallback=False)
+    config['instrument_traci'] = content['simulation'].getboolean('instrument_traci', fallback=False)
+    config['traci_backend'] = content['simulation'].get('traci_backend', fallback='sumo')
+    config['trace_file'] = content['simulation'].get('trace_file', fallback='')
+    config['export_dataset'] = content['simulation'].getboolean('export_dataset', fallback=False)
+    config['stream_metrics'] = content['simulation'].getboolean('stream_metrics', fallback=True)
+    config['stream_decisions'] = content['simulation'].getboolean('stream_decisions', fallback=False)
     config['max_steps'] = content['simulation'].getint('max_steps')
     config['n_cars_generated'] = content['simulation'].getint('n_cars_generated')
     config['green_duration'] = content['simulation'].getint('green_duration')
@@ -22,12 +30,22 @@ def import_train_configuration(config_file):
     config['batch_size'] = content['model'].getint('batch_size')
     config['learning_rate'] = content['model'].getfloat('learning_rate')
     config['training_epochs'] = content['model'].getint('training_epochs')
+    config['target_network'] = content['model'].getboolean('target_network', fallback=False)
+    config['target_sync_every'] = content['model'].getint('target_sync_every', fallback=1)
+    config['target_sync_unit'] = content['model'].get('target_sync_unit', fallback='episodes')
+    if config['target_sync_unit'] not in ('episodes', 'steps'):
+        sys.exit("unknown target_sync_unit '%s', use episodes or steps" % config['target_sync_unit'])
+    if config['target_sync_every'] < 1:
+        sys.exit("target_sync_every must be at least 1, got %d" % config['target_sync_every'])
     config['memory_size_min'] = content['memory'].getint('memory_size_min')
     config['memory_size_max'] = content['memory'].getint('memory_size_max')
     config['num_states'] = content['agent'].getint('num_states')
     config['num_actions'] = content['agent'].getint('num_actions')
     config['gamma'] = content['agent'].getfloat('gamma')
+    config['starvation_threshold'] = content['agent'].getint('starvation_threshold', fallback=0)
     config['models_path_name'] = content['dir']['models_path_name'] 
+    config['background_plots'] = content['dir'].getboolean('background_plots', fallback=True)
+    config['sumocfg_file_name'] = content['dir']['sumocfg_file_name']
     return config
 
 
@@ -42,28 +60,109 @@ def import_test_configuration(config_file):
     config['max_steps'] = content['simulation'].getint('max_steps')
     config['n_cars_generated'] = content['simulation'].getint('n_cars_generated')
     config['episode_seed'] = content['simulation'].getint('episode_seed')
+    config['profile'] = content['simulation'].getboolean('profile', fallback=False)
+    config['instrument_traci'] = content['simulation'].getboolean('instrument_traci', fallback=False)
+    config['traci_backend'] = content['simulation'].get('traci_backend', fallback='sumo')
+    config['trace_file'] = content['simulation'].get('trace_file', fallback='')
+    config['record_trace'] = content['simulation'].getboolean('record_trace', fallback=False)
+    config['record_decisions'] = content['simulation'].getboolean('record_decisions', fallback=False)
+    config['export_dataset'] = content['simulation'].getboolean('export_dataset', fallback=False)
     config['green_duration'] = content['simulation'].getint('green_duration')
     config['yellow_duration'] = content['simulation'].getint('yellow_duration')
     config['num_states'] = content['agent'].getint('num_states')
     config['num_actions'] = content['agent'].getint('num_actions')
+    config['starvation_threshold'] = content['agent'].getint('starvation_threshold', fallback=10)
+    config['inference_backend'] = content.get('model', 'inference_backend', fallback='keras')
+    if config['inference_backend'] not in ('keras', 'numpy', 'table'):
+        sys.exit("unknown inference_backend '%s', use keras, numpy or table" % config['inference_backend'])
+    config['cache_size'] = content.getint('model', 'cache_size', fallback=0)
     config['sumocfg_file_name'] = content['dir']['sumocfg_file_name']
     config['models_path_name'] = content['dir']['models_path_name']
+    config['background_plots'] = content['dir'].getboolean('background_plots', fallback=True)
     config['model_to_test'] = content['dir'].getint('model_to_test')
     config['prevmodel_path_name'] = content['dir']['prevmodel_path_name']
     config['prevmodel_no'] = content['dir']['prevmodel_no']
+    config['eval_cache_path_name'] = content['dir'].get('eval_cache_path_name', fallback='')
+    if content.has_section('evaluation'):
+        config['eval_seeds'] = [int(seed) for seed in content['evaluation']['seeds'].split(',')]
+        config['eval_workers'] = content['evaluation'].getint('workers')
+    if content.has_section('sweep'):
+        config['sweep_models'] = [path.strip() for path in content['sweep']['models'].split(',')]
+    if content.has_section('table'):
+        config['table_seeds'] = [int(seed) for seed in content['table']['table_seeds'].split(',')]
+        config['table_bin_edges'] = [[float(edge) for edge in content['table'][key].split(',')] for key in ('fine_bin_edges', 'coarse_bin_edges')]
+        config['table_max_cells'] = content['table'].getint('max_cells')
+        config['table_min_agreement'] = content['table'].getfloat('min_agreement', fallback=0.9)
+    return config
+
+
+def import_distill_configuration(config_file):
+    """
+    Read the config file regarding the distillation of a trained model and import its content
+    """
+    content = configparser.ConfigParser()
+    content.read(config_file)
+    config = {}
+    config['gui'] = content['simulation'].getboolean('gui')
+    config['max_steps'] = content['simulation'].getint('max_steps')
+    config['n_cars_generated'] = content['simulation'].getint('n_cars_generated')
+    config['episode_seeds'] = [int(seed) for seed in content['simulation']['episode_seeds'].split(',')]
+    config['green_duration'] = content['simulation'].getint('green_duration')
+    config['yellow_duration'] = content['simulation'].getint('yellow_duration')
+    config['num_states'] = content['agent'].getint('num_states')
+    config['num_actions'] = content['agent'].getint('num_actions')
+    config['num_layers'] = content['student'].getint('num_layers')
+    config['width_layers'] = content['student'].getint('width_layers')
+    config['batch_size'] = content['student'].getint('batch_size')
+    config['learning_rate'] = content['student'].getfloat('learning_rate')
+    config['training_epochs'] = content['student'].getint('training_epochs')
+    config['num_samples'] = content['student'].getint('num_samples')
+    config['max_count'] = content['student'].getint('max_count')
+    config['quantize'] = content['student'].getboolean('quantize')
+    config['sumocfg_file_name'] = content['dir']['sumocfg_file_name']
+    config['models_path_name'] = content['dir']['models_path_name']
+    config['background_plots'] = content['dir'].getboolean('background_plots', fallback=True)
+    config['model_to_test'] = content['dir'].getint('model_to_test')
+    return config
+
+
+def import_offline_train_configuration(config_file):
+    """
+    Read the config file regarding the training from datasets and import its content
+    """
+    content = configparser.ConfigParser()
+    content.read(config_file)
+    config = {}
+    config['num_layers'] = content['model'].getint('num_layers')
+    config['width_layers'] = content['model'].getint('width_layers')
+    config['batch_size'] = content['model'].getint('batch_size')
+    config['learning_rate'] = content['model'].getfloat('learning_rate')
+    config['training_epochs'] = content['model'].getint('training_epochs')
+    config['target_network'] = content['model'].getboolean('target_network')
+    config['num_states'] = content['agent'].getint('num_states')
+    config['num_actions'] = content['agent'].getint('num_actions')
+    config['gamma'] = content['agent'].getfloat('gamma')
+    config['dataset_paths'] = [path.strip() for path in content['data']['dataset_paths'].split(',')]
+    config['prefetch_depth'] = content['data'].getint('prefetch_depth')
+    config['models_path_name'] = content['dir']['models_path_name']
+    config['background_plots'] = content['dir'].getboolean('background_plots', fallback=True)
     return config
 
 
-def set_sumo(gui, sumocfg_file_name, max_steps):
+def set_sumo(gui, sumocfg_file_name, max_steps, traci_backend='sumo'):
     """
     Configure various parameters of SUMO
     """
+    if traci_backend != 'sumo':  # the fake and trace backends only read the configuration file
+        return ['sumo', "-c", os.path.join('intersection', sumocfg_file_name)]
+
     # sumo things - we need to import python modules from the $SUMO_HOME/tools directory
     if 'SUMO_HOME' in os.environ:
         tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
         sys.path.append(tools)
     else:
         sys.exit("please declare environment variable 'SUMO_HOME'")
+    from sumolib import checkBinary  # from the tools of SUMO, only needed to run SUMO itself
 
     # setting the cmd mode or the visual mode    
     if gui == False:
@@ -77,23 +176,39 @@ def set_sumo(gui, sumocfg_file_name, max_steps):
     return sumo_cmd
 
 
+def set_traci(traci_backend, trace_file):
+    """
+    Return the stand-in for the traci module of the chosen backend, None to use traci itself
+    """
+    if traci_backend == 'fake':  # queue model of the intersection, no SUMO needed
+        from fake_traci import FakeTraci
+        return FakeTraci()
+    elif traci_backend == 'trace':  # replay of the observations recorded in a previous run
+        from fake_traci import TraceTraci
+        return TraceTraci(trace_file)
+    elif traci_backend != 'sumo':
+        sys.exit("unknown traci_backend '%s', use sumo, fake or trace" % traci_backend)
+    return None
+
+
 def set_train_path(models_path_name):
     """
-    Create a new model path with an incremental integer, also considering previously created model paths
+    Create a new model path with an incremental integer, also considering previously created model paths.
+    The folder is created atomically, so that sessions started at the same time get different numbers
     """
     models_path = os.path.join(os.getcwd(), models_path_name, '')
     os.makedirs(os.path.dirname(models_path), exist_ok=True)
 
-    dir_content = os.listdir(models_path)
-    if dir_content:
-        previous_versions = [int(name.split("_")[1]) for name in dir_content]
-        new_version = str(max(previous_versions) + 1)
-    else:
-        new_version = '1'
+    previous_versions = [int(name.split("_")[1]) for name in os.listdir(models_path) if re.fullmatch(r'model_\d+', name)]
+    new_version = max(previous_versions, default=0) + 1
 
-    data_path = os.path.join(models_path, 'model_'+new_version, '')
-    os.makedirs(os.path.dirname(data_path), exist_ok=True)
-    return data_path 
+    while True:
+        data_path = os.path.join(models_path, 'model_'+str(new_version), '')
+        try:
+            os.mkdir(data_path)
+            return data_path
+        except FileExistsError:  # taken by a session started at the same time
+            new_version += 1
 
 
 def set_test_path(models_path_name, model_n):
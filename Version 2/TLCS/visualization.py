@@ -1,73 +1,66 @@
-import matplotlib.pyplot as plt
 import os
+import subprocess
+import sys
+
+from metrics import MetricsFile, METRICS_FILE_NAME
+from plotting import add_plot, render_plot
+
+PLOT_MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'plot_main.py')
+
 
 class Visualization:
-    def __init__(self, path, dpi):
+    def __init__(self, path, dpi, background=False):
             self._path = path
             self._dpi = dpi
+            self._Metrics = MetricsFile(os.path.join(path, METRICS_FILE_NAME))  # the data of every plot, as columns of one binary file
+            self._background = background  # render the plots in a separate process, that the session does not wait for
 
 
     def save_data_and_plot(self, data, filename, xlabel, ylabel):
         """
-        Produce a plot of performance of the agent over the session and save the relative data to txt
+        Produce a plot of performance of the agent over the session and save the relative data to the metrics file
         """
-        min_val = min(data)
-        max_val = max(data)
-
-        plt.rcParams.update({'font.size': 24})  # set bigger font size
-
-        plt.plot(data)
-        plt.ylabel(ylabel)
-        plt.xlabel(xlabel)
-        plt.margins(0)
-        plt.ylim(min_val - 0.05 * abs(min_val), max_val + 0.05 * abs(max_val))
-        fig = plt.gcf()
-        fig.set_size_inches(20, 11.25)
-        fig.savefig(os.path.join(self._path, 'plot_'+filename+'.png'), dpi=self._dpi)
-        plt.close("all")
-
-        with open(os.path.join(self._path, 'plot_'+filename + '_data.txt'), "w") as file:
-            for value in data:
-                    file.write("%s\n" % value)
-                 
-    
+        self.save_data_and_plot_n([data], filename, xlabel, ylabel)
+
+
     def save_data_and_plot_2(self, data1, data2, filename, xlabel, ylabel):
         """
-        Produce a plot of performance of the agent over the session and save the relative data to txt
+        Produce a plot of two series, see save_data_and_plot_n
         """
-        min_val = min(min(data1),min(data2))
-        max_val = max(max(data1),max(data2))
-
-        plt.rcParams.update({'font.size': 24})  # set bigger font size
-
-        plt.plot(data1)
-        plt.plot(data2, color='red')
-        plt.ylabel(ylabel)
-        plt.xlabel(xlabel)
-        plt.margins(0)
-        plt.ylim(min_val - 0.05 * abs(min_val), max_val + 0.05 * abs(max_val))
-        fig = plt.gcf()
-        fig.set_size_inches(20, 11.25)
-        fig.savefig(os.path.join(self._path, 'plot_'+filename+'.png'), dpi=self._dpi)
-        plt.close("all")
-        
-    def save_data_and_plot_3(self, data1, data2, data3, filename, xlabel, ylabel): 
+        self.save_data_and_plot_n([data1, data2], filename, xlabel, ylabel)
+
+
+    def save_data_and_plot_3(self, data1, data2, data3, filename, xlabel, ylabel):
         """
-        Produce a plot of performance of the agent over the session and save the relative data to txt
+        Produce a plot of three series, see save_data_and_plot_n
         """
-        min_val = min(min(min(data1),min(data2)),min(data3))
-        max_val = max(max(max(data1),max(data2)),max(data3))
-
-        plt.rcParams.update({'font.size': 24})  # set bigger font size
-
-        plt.plot(data1)
-        plt.plot(data2, color='red')
-        plt.plot(data3, color='black')
-        plt.ylabel(ylabel)
-        plt.xlabel(xlabel)
-        plt.margins(0)
-        plt.ylim(min_val - 0.05 * abs(min_val), max_val + 0.05 * abs(max_val))
-        fig = plt.gcf()
-        fig.set_size_inches(20, 11.25)
-        fig.savefig(os.path.join(self._path, 'plot_'+filename+'.png'), dpi=self._dpi)
-        plt.close("all")
+        self.save_data_and_plot_n([data1, data2, data3], filename, xlabel, ylabel)
+
+
+    def save_data_and_plot_n(self, series, filename, xlabel, ylabel):
+        """
+        Produce a plot of any number of series, downsampled when rendered, and save them to the metrics file:
+        in the column filename for a single series, filename_1, filename_2... otherwise
+        """
+        columns = [filename] if len(series) == 1 else [filename + '_%d' % (i + 1) for i in range(len(series))]
+        for column, data in zip(columns, series):
+            self._Metrics.write(column, data)
+        self._Metrics.flush()
+        self._plot(filename, columns, xlabel, ylabel)
+
+
+    def _plot(self, filename, columns, xlabel, ylabel):
+        """
+        Record how to plot the columns and render the plot, in a background process if required
+        """
+        add_plot(self._path, filename, columns, xlabel, ylabel, self._dpi)
+        if self._background:  # errors are logged to plots.log, the plot can be rendered again with plot_main.py
+            subprocess.Popen([sys.executable, PLOT_MAIN, self._path, '--plots', filename],
+                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+        else:
+            render_plot(self._path, filename)
+
+
+    @property
+    def metrics(self):
+        return self._Metrics